@@ -1,8 +1,12 @@
+import base64
+import json
 import os
+import random
+import re
 import time
 from datetime import datetime, timedelta
 
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, Response, request, jsonify, make_response, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -12,8 +16,23 @@ from bson.objectid import ObjectId
 import bcrypt
 import jwt  # PyJWT
 
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 
+from audit import AuditWriter
+from profiler import RequestProfiler, server_timing
+from pricing import RateTable, QuoteError, quote
+from events import ChangeFeed
+from jobs import JobQueue, JOB_TYPES, InvalidJob, parse_import_payload, parse_reprice_payload
+from breaker import CircuitBreaker, DatabaseUnavailable, SnapshotCache
+from singleflight import Group
+from priceboard import PriceBoards, RebuildRetrier
+from search import CropSearch
+from shmcache import SharedCache
+from storage import (
+    create_store, CachedStore, CompanyNotFound, UsernameTaken, CatalogNotFound, CropNotFound, CropExists, RateConflict,
+)
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -27,12 +46,87 @@ CORS(
     supports_credentials=True,
 )
 
-# MongoDB
+# Storage: STORAGE_BACKEND=mongo (default) | memory | sqlite:///path/to/farmdesk.db
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+
+# MongoDB. Without it (memory/sqlite storage) auditing is off, the change feed and
+# price boards are process-local and background jobs are unavailable.
 MONGO_URL = os.getenv("DATABASE_URL")
-client = MongoClient(MONGO_URL)
-db = client["FarmDesk"]
-companies = db.companies       # company documents with embedded employees
-crops = db.crops       # unchanged shape: one doc per company_id with crop_details array
+if STORAGE_BACKEND == "mongo":
+    client = MongoClient(MONGO_URL)
+    db = client["FarmDesk"]
+    audit_events = db.audit_events  # append-only audit stream, written in batches off the request path
+else:
+    client = db = audit_events = None
+
+audit = AuditWriter(
+    audit_events,
+    max_queue=int(os.getenv("AUDIT_MAX_QUEUE", 10000)),
+    batch_size=int(os.getenv("AUDIT_BATCH_SIZE", 500)),
+    flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", 1.0)),
+    max_attempts=int(os.getenv("AUDIT_MAX_ATTEMPTS", 5)),
+)
+
+# Every handler-level database call goes through the breaker with a tight deadline;
+# read endpoints fall back to last-known-good snapshots while it is open
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("DB_BREAKER_THRESHOLD", 5)),
+    reset_timeout=float(os.getenv("DB_BREAKER_RESET_SECONDS", 10)),
+    call_timeout=float(os.getenv("DB_CALL_TIMEOUT_MS", 1500)) / 1000,
+)
+snapshots = SnapshotCache(
+    max_entries=int(os.getenv("SNAPSHOT_MAX_ENTRIES", 5000)),
+    max_weight=int(os.getenv("SNAPSHOT_MAX_ITEMS", 200000)),   # total rows (officers, crops) held
+)
+
+def db_call(fn, *args, **kwargs):
+    return breaker.call(fn, *args, **kwargs)
+
+# Concurrent identical per-company reads share one query
+flights = Group()
+
+# Employees and crop catalogs; the Mongo backend keeps the original document shapes
+store = create_store(STORAGE_BACKEND, db, call=db_call, flights=flights)
+
+# Host-wide cache shared by every worker process on the box (SHM_CACHE_PATH, e.g.
+# /dev/shm/farmdesk.cache): crop catalogs and principals are loaded once per host
+SHM_CACHE_PATH = os.getenv("SHM_CACHE_PATH")
+shared_cache = None
+if SHM_CACHE_PATH:
+    shared_cache = SharedCache(
+        SHM_CACHE_PATH,
+        capacity=int(os.getenv("SHM_CACHE_MB", 64)) << 20,
+        ttl=float(os.getenv("SHM_CACHE_TTL_SECONDS", 5)),
+    )
+    store = CachedStore(store, shared_cache)
+
+# Change notifications for SSE subscribers (capped collection, one tailing listener per worker)
+feed = ChangeFeed(db, heartbeat=float(os.getenv("SSE_HEARTBEAT_SECONDS", 15)), call=db_call)
+
+# Immutable per-company rate snapshots for officers, rebuilt on crop mutations
+price_boards = PriceBoards(
+    db,
+    cache_size=int(os.getenv("PRICE_BOARD_CACHE", 1000)),
+    load_catalog=None if db is not None else (lambda company_id: store.get_crops(company_id, create=False)),
+    keep_versions=int(os.getenv("PRICE_BOARD_KEEP_VERSIONS", 20)),
+)
+board_retries = RebuildRetrier(
+    lambda company_id: _rebuild_and_announce(company_id),
+    interval=float(os.getenv("PRICE_BOARD_RETRY_SECONDS", 5)),
+)
+
+# Per-company crop name index, patched by the crop handlers and rebuilt when the
+# price board head shows the catalog changed elsewhere
+crop_search = CropSearch(
+    load_catalog=lambda company_id: store.get_crops(company_id, create=False),
+    current_version=lambda company_id: db_call(price_boards.current_version, company_id),
+    max_companies=int(os.getenv("SEARCH_MAX_COMPANIES", 500)),
+    revalidate_seconds=float(os.getenv("SEARCH_REVALIDATE_SECONDS", 1.0)),
+    flights=flights,
+)
+
+# Long-running work is queued here and processed by worker.py
+job_queue = JobQueue(db.jobs) if db is not None else None
 
 # JWT secret
 JWT_SECRET = os.getenv("JWT_SECRET", "dev_secret_change_me")
@@ -44,6 +138,44 @@ COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "Lax")                  # Lax/Str
 COOKIE_NAME = os.getenv("COOKIE_NAME", "auth_token")
 COOKIE_PATH = "/"
 
+# /api/batch: sub-request cap, parallelism for read-only sub-requests, and the
+# WSGI environ key used to hand the authenticated principal to sub-requests
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 8))
+BATCH_PRINCIPAL_ENV = "farmdesk.batch_principal"
+
+# Largest page /admin/officers will return when ?limit= is given
+OFFICERS_PAGE_MAX = int(os.getenv("OFFICERS_PAGE_MAX", 1000))
+
+# Browser cache lifetime for immutable price board versions
+PRICE_BOARD_MAX_AGE = int(os.getenv("PRICE_BOARD_MAX_AGE", 31536000))
+
+# Largest crop list accepted by one import_crops job
+JOB_IMPORT_MAX_ROWS = int(os.getenv("JOB_IMPORT_MAX_ROWS", 50000))
+
+# /admin/crops/search: default and largest page, longest accepted query
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", 20))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 100))
+SEARCH_MAX_QUERY = 100
+
+# /admin/crops/reprice: largest explicit rate list, and how often a re-price is
+# recomputed when crops change between reading and writing the catalog
+REPRICE_MAX_ROWS = int(os.getenv("REPRICE_MAX_ROWS", 5000))
+REPRICE_RETRIES = 3
+
+# Upper bound on lines accepted by one /admin/crops/quote call
+QUOTE_MAX_LINES = int(os.getenv("QUOTE_MAX_LINES", 20000))
+
+# Request profiler: sample a fraction of requests, or any request carrying a
+# profile token issued by an admin (see /admin/profiler/token)
+PROFILE_HEADER = "X-Profile-Token"
+profiler = RequestProfiler(
+    os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")),
+    interval=float(os.getenv("PROFILE_INTERVAL_MS", 2)) / 1000,
+    max_files=int(os.getenv("PROFILE_MAX_FILES", 200)),
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+)
+
 # ---------- Utilities ----------
 def hash_password(plain: str) -> bytes:
     return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt())
@@ -90,42 +222,58 @@ def get_token_from_request():
         return auth.split(" ", 1)[1].strip()
     return None
 
+def _load_principal(company_id, emp_id, username=None):
+    emp = store.get_employee(company_id, emp_id, username)
+    if not emp:
+        return None
+
+    # Minimal user view for downstream handlers
+    return {
+        "_id": str(emp.get("_id")),
+        "username": emp.get("username"),
+        "role": normalize_role(emp.get("role")),
+        "company_id": company_id,
+    }
+
 def current_user():
+    # Sub-requests of /api/batch carry the principal the batch already authenticated
+    principal = request.environ.get(BATCH_PRINCIPAL_ENV)
+    if principal is not None:
+        return dict(principal), None
+
     token = get_token_from_request()
     if not token:
         return None, "Missing token"
     try:
         payload = jwt_verify(token)
-        company_id = payload.get("company_id")
-        emp_id = payload.get("sub")
-        username = payload.get("username")
-        if not company_id or not emp_id:
-            return None, "Invalid token"
-
-        comp = companies.find_one({"company_id": company_id}, {"employees.password_hash": 0})
-        if not comp:
-            return None, "User not found"
-
-        emp = None
-        for e in comp.get("employees", []):
-            if str(e.get("_id")) == str(emp_id) or (username and e.get("username") == username):
-                emp = e
-                break
-
-        if not emp:
-            return None, "User not found"
-
-        # Minimal user view for downstream handlers
-        view = {
-            "_id": str(emp.get("_id")),
-            "username": emp.get("username"),
-            "role": normalize_role(emp.get("role")),
-            "company_id": comp.get("company_id"),
-        }
-        return view, None
     except Exception:
         return None, "Invalid or expired token"
 
+    company_id = payload.get("company_id")
+    emp_id = payload.get("sub")
+    username = payload.get("username")
+    if not company_id or not emp_id:
+        return None, "Invalid token"
+
+    key = ("principal", company_id, str(emp_id))
+    try:
+        view = _load_principal(company_id, emp_id, username)
+    except DatabaseUnavailable:
+        # Token is valid; vouch for the user from the last successful lookup
+        entry = snapshots.serve_stale(key, lambda: _load_principal(company_id, emp_id, username))
+        if entry is None:
+            raise
+        g.stale = True
+        return dict(entry[0]), None
+    except Exception:
+        return None, "Invalid or expired token"
+
+    if not view:
+        snapshots.discard(key)
+        return None, "User not found"
+    snapshots.put(key, view)
+    return view, None
+
 def require_auth(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
@@ -168,17 +316,93 @@ def clear_auth_cookie(resp):
     resp.set_cookie(COOKIE_NAME, "", expires=0, path=COOKIE_PATH, samesite=COOKIE_SAMESITE, secure=COOKIE_SECURE)
     return resp
 
+# ---------- Request profiling ----------
+def _profile_requested():
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        try:
+            return jwt_verify(token).get("scope") == "profile"
+        except Exception:
+            return False
+    return profiler.sample_rate > 0 and random.random() < profiler.sample_rate
+
+@app.before_request
+def start_profile():
+    if _profile_requested():
+        label = re.sub(r"[^A-Za-z0-9]+", "_", f"{request.method}{request.path}").strip("_")
+        g.profile = profiler.start(label)
+
+@app.after_request
+def finish_profile(resp):
+    session = g.pop("profile", None)
+    if session is not None:
+        # Profiling is diagnostics only: a failure writing it must not change the response
+        try:
+            profile_id, breakdown = profiler.finish(session)
+        except Exception:
+            return resp
+        resp.headers["X-Profile-Id"] = profile_id
+        resp.headers["Server-Timing"] = server_timing(breakdown)
+    return resp
+
+# ---------- Degraded mode ----------
+@app.errorhandler(DatabaseUnavailable)
+def database_unavailable(e):
+    resp = jsonify({"error": "Service temporarily unavailable, please retry shortly"})
+    resp.headers["Retry-After"] = str(max(1, int(breaker.reset_timeout)))
+    return resp, 503
+
+def stale_response(body, stored_at):
+    # Last-known-good data served while the database is unavailable
+    body = dict(body, stale=True, stale_since=datetime.utcfromtimestamp(stored_at).isoformat() + "Z")
+    resp = make_response(jsonify(body))
+    resp.headers["X-Data-Stale"] = "true"
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+@app.after_request
+def flag_stale(resp):
+    if g.get("stale"):
+        resp.headers["X-Data-Stale"] = "true"
+    return resp
+
 # ---------- Auth helpers ----------
 def _find_employee_for_login(company_id, username, want_role=None):
-    comp = companies.find_one({"company_id": company_id})
-    if not comp:
-        return None, None
-    for e in comp.get("employees", []):
-        if e.get("username") == username:
-            if want_role and normalize_role(e.get("role")) != want_role:
-                continue
-            return comp, e
-    return comp, None
+    # Returns (company_exists, employee); employee is None when the role does not match
+    exists, emp = store.find_employee(company_id, username)
+    if emp and want_role and normalize_role(emp.get("role")) != want_role:
+        return exists, None
+    return exists, emp
+
+# ---------- Officer roster helpers ----------
+# Officers live embedded in the company document, so the roster is unwound
+# by the store and returned in username order; the cursor is the last username seen.
+def _encode_cursor(username):
+    return base64.urlsafe_b64encode(username.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor):
+    return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+
+def _officer_view(company_id, e):
+    return {"_id": str(e.get("_id")), "username": e.get("username"), "role": "Officer", "company_id": company_id}
+
+def _load_roster(company_id):
+    return [_officer_view(company_id, e) for e in store.list_officers(company_id)]
+
+def _stream_roster(cursor, view, limit=None):
+    # Writes {"items": [...], "next_cursor": ...} one officer at a time
+    yield '{"items":['
+    last = None
+    sent = 0
+    for e in cursor:
+        if limit and sent == limit:
+            yield '],"next_cursor":' + json.dumps(_encode_cursor(last)) + "}"
+            return
+        item = view(e)
+        yield ("," if sent else "") + json.dumps(item)
+        last = item["username"]
+        sent += 1
+    yield '],"next_cursor":null}'
 
 # ---------- Super Admin: create company admin ----------
 @app.route('/superadmin/create_admin', methods=['POST'])
@@ -193,29 +417,19 @@ def create_company_admin():
 
     hashed_pw = hash_password(password)
 
-    comp = companies.find_one({"company_id": company_id})
-    if not comp:
-        emp = {
-            "_id": str(ObjectId()),
-            "username": username,
-            "password_hash": hashed_pw,
-            "role": "Admin",
-        }
-        companies.insert_one({"company_id": company_id, "employees": [emp]})
-        return jsonify({"message": "Company admin created successfully", "id": emp["_id"]}), 201
-
-    # company exists -> check username uniqueness
-    for e in comp.get("employees", []):
-        if e.get("username") == username:
-            return jsonify({"error": "Username already exists in this company"}), 409
-
     emp = {
         "_id": str(ObjectId()),
         "username": username,
         "password_hash": hashed_pw,
         "role": "Admin",
     }
-    companies.update_one({"company_id": company_id}, {"$push": {"employees": emp}})
+    # Creates the company on its first admin; usernames are unique per company
+    try:
+        store.add_employee(company_id, emp, create_company=True)
+    except UsernameTaken:
+        return jsonify({"error": "Username already exists in this company"}), 409
+
+    audit.emit("admin.create", company_id, actor="superadmin", target=emp["_id"], username=username)
     return jsonify({"message": "Company admin created successfully", "id": emp["_id"]}), 201
 
 # ---------- Auth: me, login, logout ----------
@@ -224,6 +438,8 @@ def auth_me():
     user, err = current_user()
     if err:
         return jsonify({"error": err}), 401
+    if g.get("stale"):
+        user = dict(user, stale=True)
     return jsonify(user), 200
 
 @app.route("/api/auth/logout", methods=["POST"])
@@ -241,15 +457,19 @@ def admin_login():
     if not company_id or not username or not password:
         return jsonify({"error": "Missing required fields"}), 400 
 
-    comp, emp = _find_employee_for_login(company_id, username, want_role="Admin")
-    if comp is None:
+    exists, emp = _find_employee_for_login(company_id, username, want_role="Admin")
+    if not exists:
+        audit.emit("login.failure", company_id, actor=username, role="Admin", reason="user_not_found")
         return jsonify({"error": "User Not Found"}), 401
     if emp is None:
+        audit.emit("login.failure", company_id, actor=username, role="Admin", reason="role")
         return jsonify({"error": "Unauthorized role"}), 403
 
     if not check_password(password, emp.get("password_hash", b"")):
+        audit.emit("login.failure", company_id, actor=username, role="Admin", reason="password")
         return jsonify({"error": "Please Enter Correct Password"}), 401
 
+    audit.emit("login.success", company_id, actor=username, target=str(emp.get("_id")), role="Admin")
     token = jwt_issue_for_employee(company_id, emp, ttl_hours=8)
     resp = make_response(jsonify({"message": "Login successful"}))
     set_auth_cookie(resp, token, hours=8)
@@ -265,35 +485,133 @@ def officer_login():
     if not company_id or not username or not password:
         return jsonify({"error": "Missing required fields"}), 400
 
-    comp, emp = _find_employee_for_login(company_id, username, want_role="Officer")
-    if comp is None or emp is None:
+    exists, emp = _find_employee_for_login(company_id, username, want_role="Officer")
+    if not exists or emp is None:
+        audit.emit("login.failure", company_id, actor=username, role="Officer", reason="user_not_found")
         return jsonify({"error": "User Not Found"}), 401
 
     if not check_password(password, emp.get("password_hash", b"")):
+        audit.emit("login.failure", company_id, actor=username, role="Officer", reason="password")
         return jsonify({"error": "Please Enter Correct Password"}), 401
 
+    audit.emit("login.success", company_id, actor=username, target=str(emp.get("_id")), role="Officer")
     token = jwt_issue_for_employee(company_id, emp, ttl_hours=8)
     resp = make_response(jsonify({"message": "Login successful"}))
     set_auth_cookie(resp, token, hours=8)
     return resp, 200
 
+# ---------- Change stream (SSE) ----------
+# Needs a worker that can hold connections open (threaded dev server, gunicorn gthread/gevent).
+@app.route("/api/events/stream", methods=["GET"])
+@require_auth
+def event_stream():
+    company_id = request.user.get("company_id")
+    # Officers only see catalog changes; the roster is admin-only
+    kinds = None if request.user.get("role") == "Admin" else {"crop", "price_board"}
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    resp = Response(feed.stream(company_id, last_event_id, kinds), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+# ---------- Admin: metrics ----------
+@app.route("/admin/metrics", methods=["GET"])
+@require_role("Admin")
+def metrics():
+    # Per-worker counters
+    return jsonify({
+        "storage": store.name,
+        "search": {"builds": crop_search.builds, "refreshes": crop_search.refreshes},
+        "price_board_retries": board_retries.stats(),
+        "shared_cache": shared_cache.stats() if shared_cache else None,
+        "singleflight": flights.stats(),
+        "breaker": breaker.stats(),
+        "audit": audit.stats(),
+    }), 200
+
+# ---------- Admin: profiler ----------
+@app.route("/admin/profiler/token", methods=["POST"])
+@require_role("Admin")
+def issue_profile_token():
+    data = request.json or {}
+    try:
+        ttl_minutes = min(max(int(data.get("ttl_minutes", 5)), 1), 60)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid ttl_minutes"}), 400
+
+    now = int(time.time())
+    token = jwt.encode({
+        "scope": "profile",
+        # No sub/company_id: a profile token must never work as a session token
+        "issued_by": request.user.get("_id"),
+        "issued_for": request.user.get("company_id"),
+        "iat": now,
+        "exp": now + 60 * ttl_minutes,
+    }, JWT_SECRET, algorithm=JWT_ALG)
+    return jsonify({"header": PROFILE_HEADER, "token": token, "expires_in": 60 * ttl_minutes}), 200
+
 # ---------- Admin: Officers management (embedded) ----------
 @app.route("/admin/officers", methods=["GET"])
 @require_role("Admin")
 def list_officers():
     company_id = request.user.get("company_id")
-    comp = companies.find_one({"company_id": company_id}, {"employees.password_hash": 0})
-    items = []
-    if comp:
-        for e in comp.get("employees", []):
-            if normalize_role(e.get("role")) == "Officer":
-                items.append({
-                    "_id": str(e.get("_id")),
-                    "username": e.get("username"),
-                    "role": "Officer",
-                    "company_id": company_id
-                })
-    return jsonify({"items": items}), 200
+
+    prefix = (request.args.get("prefix") or "").strip()
+    stream = request.args.get("stream", "").lower() in ("1", "true", "yes")
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = min(max(int(limit), 1), OFFICERS_PAGE_MAX)
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = _decode_cursor(request.args["cursor"])
+        except Exception:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    try:
+        cursor = store.list_officers(company_id, prefix, after, limit + 1 if limit else None)
+    except DatabaseUnavailable:
+        # The full roster answers any query; failing that, this exact page as last served
+        entry = snapshots.serve_stale(("officers", company_id), lambda: _load_roster(company_id))
+        if entry is None:
+            entry = snapshots.get(("officers", company_id, prefix, after, limit))
+            if entry is None:
+                raise
+            return stale_response(entry[0], entry[1]), 200
+        items = [o for o in entry[0] if o["username"].startswith(prefix) and (after is None or o["username"] > after)]
+        next_cursor = None
+        if limit and len(items) > limit:
+            items = items[:limit]
+            next_cursor = _encode_cursor(items[-1]["username"])
+        return stale_response({"items": items, "next_cursor": next_cursor}, entry[1]), 200
+
+    if stream:
+        # Streams are not snapshotted (that would hold the roster they avoid holding);
+        # in degraded mode they are answered from the full-roster or page snapshots
+        return Response(_stream_roster(cursor, lambda e: _officer_view(company_id, e), limit), mimetype="application/json")
+
+    items = [_officer_view(company_id, e) for e in cursor]
+    next_cursor = None
+    if limit and len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor(items[-1]["username"])
+    body = {"items": items, "next_cursor": next_cursor}
+    if not limit and not prefix and after is None:
+        # Full roster: keep it as the last-known-good copy for degraded mode
+        snapshots.put(("officers", company_id), items)
+    else:
+        snapshots.put(("officers", company_id, prefix, after, limit), body, weight=len(items) + 1)
+    return jsonify(body), 200
 
 @app.route("/admin/officers", methods=["POST"])
 @require_role("Admin")
@@ -306,21 +624,20 @@ def create_officer():
     if not username or not password:
         return jsonify({"error": "Username and password are required"}), 400
 
-    comp = companies.find_one({"company_id": company_id})
-    if not comp:
-        return jsonify({"error": "Company not found"}), 404
-
-    for e in comp.get("employees", []):
-        if e.get("username") == username:
-            return jsonify({"error": "Username already exists"}), 409
-
     emp = {
         "_id": str(ObjectId()),
         "username": username,
         "password_hash": hash_password(password),
         "role": "Officer",
     }
-    companies.update_one({"company_id": company_id}, {"$push": {"employees": emp}})
+    try:
+        store.add_employee(company_id, emp)
+    except CompanyNotFound:
+        return jsonify({"error": "Company not found"}), 404
+    except UsernameTaken:
+        return jsonify({"error": "Username already exists"}), 409
+    audit.emit("officer.create", company_id, actor=request.user.get("username"), target=emp["_id"], username=username)
+    feed.publish(company_id, "officer", "create", _id=emp["_id"], username=username)
     return jsonify({"message": "Officer created", "id": emp["_id"]}), 201
 
 @app.route("/admin/officers/<officer_id>", methods=["DELETE"])
@@ -328,41 +645,36 @@ def create_officer():
 def delete_officer(officer_id):
     company_id = request.user.get("company_id")
 
-    comp = companies.find_one({"company_id": company_id})
-    if not comp:
+    try:
+        deleted = store.delete_officer(company_id, officer_id)
+    except CompanyNotFound:
         return jsonify({"error": "Company not found"}), 404
-
-    exists = False
-    for e in comp.get("employees", []):
-        if str(e.get("_id")) == str(officer_id) and normalize_role(e.get("role")) == "Officer":
-            exists = True
-            break
-    if not exists:
+    if not deleted:
         return jsonify({"error": "Officer not found"}), 404
 
-    companies.update_one(
-        {"company_id": company_id},
-        {"$pull": {"employees": {"_id": officer_id}}}
-    )
+    audit.emit("officer.delete", company_id, actor=request.user.get("username"), target=officer_id)
+    feed.publish(company_id, "officer", "delete", _id=officer_id)
     return jsonify({"message": "Officer deleted"}), 200
 
-# ---------- Admin: Crops management (unchanged storage) ----------
+# ---------- Admin: Crops management ----------
 @app.route("/admin/crops", methods=["GET"])
 @require_role("Admin")
 def list_crops():
     user = request.user
     company_id = user.get("company_id")
+    key = ("crops", company_id)
 
-    # Find or create crops document for this company
-    crop_doc = crops.find_one({"company_id": company_id})
-    if not crop_doc:
-        crop_doc = {
-            "company_id": company_id,
-            "crop_details": []
-        }
-        crops.insert_one(crop_doc)
+    try:
+        # Creates an empty catalog for the company on first visit
+        crop_details = store.get_crops(company_id)
+    except DatabaseUnavailable:
+        entry = snapshots.serve_stale(key, lambda: store.get_crops(company_id))
+        if entry is None:
+            raise
+        return stale_response({"crop_details": entry[0]}, entry[1]), 200
 
-    return jsonify({"crop_details": crop_doc.get("crop_details", [])}), 200
+    snapshots.put(key, crop_details)
+    return jsonify({"crop_details": crop_details}), 200
 
 @app.route("/admin/crops", methods=["POST"])
 @require_role("Admin")
@@ -384,12 +696,6 @@ def add_crop():
     except (ValueError, TypeError):
         return jsonify({"error": "Invalid rate per unit"}), 400
 
-    crop_doc = crops.find_one({"company_id": company_id})
-    if crop_doc:
-        existing = crop_doc.get("crop_details", [])
-        if any(c["crop_name"].lower() == crop_name.lower() for c in existing):
-            return jsonify({"error": "Crop already exists"}), 409
-
     new_crop = {
         "crop_name": crop_name,
         "rate_per_unit": rate_per_unit,
@@ -399,17 +705,15 @@ def add_crop():
         "updated_by": user.get("username")
     }
 
-    if crop_doc:
-        crops.update_one(
-            {"company_id": company_id},
-            {"$push": {"crop_details": new_crop}}
-        )
-    else:
-        crops.insert_one({
-            "company_id": company_id,
-            "crop_details": [new_crop]
-        })
-
+    try:
+        store.add_crop(company_id, new_crop)
+    except CropExists:
+        return jsonify({"error": "Crop already exists"}), 409
+    crop_search.crop_added(company_id, new_crop)
+
+    audit.emit("crop.add", company_id, actor=user.get("username"), target=crop_name, rate_per_unit=rate_per_unit)
+    feed.publish(company_id, "crop", "add", crop_name=crop_name, rate_per_unit=rate_per_unit)
+    publish_price_board(company_id)
     return jsonify({"message": "Crop added successfully", "crop": new_crop}), 201
 
 @app.route("/admin/crops/<crop_name>", methods=["PUT"])
@@ -432,40 +736,30 @@ def update_crop(crop_name):
     except (ValueError, TypeError):
         return jsonify({"error": "Invalid rate per unit"}), 400
 
-    crop_doc = crops.find_one({"company_id": company_id})
-    if not crop_doc:
+    try:
+        before, updated = store.update_crop(company_id, crop_name, {
+            "crop_name": new_crop_name,
+            "rate_per_unit": rate_per_unit,
+            "updated_at": datetime.utcnow(),
+            "updated_by": user.get("username")
+        })
+    except CatalogNotFound:
         return jsonify({"error": "No crops found for this company"}), 404
-
-    crop_details = crop_doc.get("crop_details", [])
-    crop_index = None
-
-    for i, crop in enumerate(crop_details):
-        if crop["crop_name"] == crop_name:
-            crop_index = i
-            break
-
-    if crop_index is None:
+    except CropNotFound:
         return jsonify({"error": "Crop not found"}), 404
+    except CropExists:
+        return jsonify({"error": "Crop name already exists"}), 409
 
-    for i, crop in enumerate(crop_details):
-        if i != crop_index and crop["crop_name"].lower() == new_crop_name.lower():
-            return jsonify({"error": "Crop name already exists"}), 409
+    crop_search.crop_updated(company_id, crop_name, updated)
+    previous_rate = before.get("rate_per_unit")
 
-    crop_details[crop_index] = {
-        "crop_name": new_crop_name,
-        "rate_per_unit": rate_per_unit,
-        "created_at": crop_details[crop_index]["created_at"],
-        "updated_at": datetime.utcnow(),
-        "created_by": crop_details[crop_index]["created_by"],
-        "updated_by": user.get("username")
-    }
-
-    crops.update_one(
-        {"company_id": company_id},
-        {"$set": {"crop_details": crop_details}}
+    audit.emit(
+        "crop.update", company_id, actor=user.get("username"), target=crop_name,
+        crop_name=new_crop_name, rate_per_unit=rate_per_unit, previous_rate=previous_rate,
     )
-
-    return jsonify({"message": "Crop updated successfully", "crop": crop_details[crop_index]}), 200
+    feed.publish(company_id, "crop", "update", crop_name=new_crop_name, previous_name=crop_name, rate_per_unit=rate_per_unit)
+    publish_price_board(company_id)
+    return jsonify({"message": "Crop updated successfully", "crop": updated}), 200
 
 @app.route("/admin/crops/<crop_name>", methods=["DELETE"])
 @require_role("Admin")
@@ -473,22 +767,404 @@ def delete_crop(crop_name):
     user = request.user
     company_id = user.get("company_id")
 
-    crop_doc = crops.find_one({"company_id": company_id})
-    if not crop_doc:
+    try:
+        store.delete_crop(company_id, crop_name)
+    except CatalogNotFound:
         return jsonify({"error": "No crops found for this company"}), 404
+    except CropNotFound:
+        return jsonify({"error": "Crop not found"}), 404
+    crop_search.crop_removed(company_id, crop_name)
 
-    crop_details = crop_doc.get("crop_details", [])
-    updated_crops = [crop for crop in crop_details if crop["crop_name"] != crop_name]
+    audit.emit("crop.delete", company_id, actor=user.get("username"), target=crop_name)
+    feed.publish(company_id, "crop", "delete", crop_name=crop_name)
+    publish_price_board(company_id)
+    return jsonify({"message": "Crop deleted successfully"}), 200
 
-    if len(updated_crops) == len(crop_details):
-        return jsonify({"error": "Crop not found"}), 404
+def _parse_reprice(data):
+    # Shape checks that need no database read; returns (spec, error)
+    modes = [m for m in ("percent", "amount", "rates") if data.get(m) is not None]
+    if len(modes) != 1:
+        return None, "Provide exactly one of percent, amount or rates"
+    mode = modes[0]
+
+    if mode == "rates":
+        rows = data["rates"]
+        if not isinstance(rows, list) or not rows:
+            return None, "rates must be a non-empty list"
+        if len(rows) > REPRICE_MAX_ROWS:
+            return None, f"At most {REPRICE_MAX_ROWS} rates per re-price"
+        return {"mode": mode, "rows": rows}, None
+
+    try:
+        value = float(data[mode])
+    except (ValueError, TypeError):
+        return None, f"Invalid {mode}"
+    if value != value or value in (float("inf"), float("-inf")):
+        return None, f"Invalid {mode}"
+    if mode == "percent" and value <= -100:
+        return None, "percent must be greater than -100"
+
+    prefix = data.get("prefix")
+    names = data.get("names")
+    if prefix is not None and (not isinstance(prefix, str) or not prefix.strip()):
+        return None, "prefix must be a non-empty string"
+    if names is not None and (not isinstance(names, list) or not names or not all(isinstance(n, str) for n in names)):
+        return None, "names must be a non-empty list of crop names"
+    if names is not None and len(names) > REPRICE_MAX_ROWS:
+        return None, f"At most {REPRICE_MAX_ROWS} names per re-price"
+    if prefix is None and names is None and data.get("all") is not True:
+        return None, "Choose crops with prefix or names, or pass all: true"
+    return {"mode": mode, "value": value, "prefix": (prefix or "").strip().lower(), "names": names}, None
+
+def _plan_reprice(spec, crop_details):
+    # Returns ({crop_name: (current_rate, new_rate)}, errors); crop names match case-insensitively
+    by_key = {c["crop_name"].lower(): c for c in crop_details}
+    plan = {}
+    errors = []
+
+    if spec["mode"] == "rates":
+        for n, row in enumerate(spec["rows"]):
+            if not isinstance(row, dict):
+                errors.append({"row": n, "error": "Row must be an object"})
+                continue
+            crop = by_key.get((row.get("crop_name") or "").strip().lower())
+            if crop is None:
+                errors.append({"row": n, "error": f"Unknown crop: {row.get('crop_name')}" if row.get("crop_name") else "crop_name is required"})
+                continue
+            if crop["crop_name"] in plan:
+                errors.append({"row": n, "error": f"Duplicate crop: {crop['crop_name']}"})
+                continue
+            try:
+                rate = float(row.get("rate_per_unit"))
+            except (ValueError, TypeError):
+                errors.append({"row": n, "error": "Invalid rate per unit"})
+                continue
+            if rate != rate or rate < 0 or rate == float("inf"):
+                errors.append({"row": n, "error": "Rate per unit must be positive"})
+                continue
+            plan[crop["crop_name"]] = (crop["rate_per_unit"], rate)
+        return plan, errors
+
+    if spec["names"] is not None:
+        selected = []
+        for n, name in enumerate(spec["names"]):
+            crop = by_key.get(name.strip().lower())
+            if crop is None:
+                errors.append({"row": n, "error": f"Unknown crop: {name}"})
+            else:
+                selected.append(crop)
+    else:
+        selected = crop_details
+    for crop in selected:
+        if not crop["crop_name"].lower().startswith(spec["prefix"]):
+            continue
+        current = crop["rate_per_unit"]
+        if spec["mode"] == "percent":
+            rate = round(current * (1 + spec["value"] / 100), 2)
+        else:
+            rate = round(current + spec["value"], 2)
+        if rate < 0:
+            errors.append({"crop_name": crop["crop_name"], "error": f"Rate would drop below zero ({rate})"})
+            continue
+        plan[crop["crop_name"]] = (current, rate)
+    return plan, errors
+
+@app.route("/admin/crops/reprice", methods=["POST"])
+@require_role("Admin")
+def reprice_crops():
+    user = request.user
+    company_id = user.get("company_id")
+    data = request.json or {}
 
-    crops.update_one(
-        {"company_id": company_id},
-        {"$set": {"crop_details": updated_crops}}
+    spec, err = _parse_reprice(data)
+    if err:
+        return jsonify({"error": err}), 400
+
+    # Validated against the catalog as read; the write only lands if every touched
+    # crop still has the rate the plan was computed from, otherwise recompute.
+    for _ in range(REPRICE_RETRIES):
+        plan, errors = _plan_reprice(spec, store.get_crops(company_id, create=False))
+        if errors:
+            return jsonify({"error": "Invalid re-price", "details": errors[:100]}), 400
+        if not plan:
+            return jsonify({"message": "No crops matched", "updated": 0, "crops": []}), 200
+        if len(plan) > REPRICE_MAX_ROWS:
+            # Keeps one request's write within the breaker deadline; larger runs belong in a reprice_crops job
+            return jsonify({"error": f"{len(plan)} crops matched; at most {REPRICE_MAX_ROWS} per re-price, use a reprice_crops job"}), 400
+        try:
+            store.set_rates(company_id, plan, datetime.utcnow(), user.get("username"))
+            break
+        except (RateConflict, CatalogNotFound):
+            continue
+    else:
+        return jsonify({"error": "Crops changed while re-pricing, please retry"}), 409
+
+    for crop_name, (_, rate) in plan.items():
+        crop_search.crop_updated(company_id, crop_name, {"crop_name": crop_name, "rate_per_unit": rate})
+    audit.emit(
+        "crop.reprice", company_id, actor=user.get("username"), mode=spec["mode"],
+        value=spec.get("value"), count=len(plan),
     )
+    feed.publish(company_id, "crop", "bulk", updated=len(plan))
+    publish_price_board(company_id)
+    return jsonify({
+        "message": "Crops re-priced",
+        "updated": len(plan),
+        "crops": [
+            {"crop_name": name, "previous_rate": previous, "rate_per_unit": rate}
+            for name, (previous, rate) in plan.items()
+        ],
+    }), 200
+
+@app.route("/admin/crops/search", methods=["GET"])
+@require_role("Admin", "Officer")
+def search_crops():
+    company_id = request.user.get("company_id")
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    if len(query) > SEARCH_MAX_QUERY:
+        return jsonify({"error": f"q must be at most {SEARCH_MAX_QUERY} characters"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
 
-    return jsonify({"message": "Crop deleted successfully"}), 200
+    return jsonify({"query": query, "items": crop_search.search(company_id, query, limit)}), 200
+
+@app.route("/admin/crops/quote", methods=["POST"])
+@require_role("Admin", "Officer")
+def quote_crops():
+    company_id = request.user.get("company_id")
+    data = request.json or {}
+    lines = data.get("lines")
+
+    if not isinstance(lines, list) or not lines:
+        return jsonify({"error": "lines must be a non-empty list"}), 400
+    if len(lines) > QUOTE_MAX_LINES:
+        return jsonify({"error": f"At most {QUOTE_MAX_LINES} lines per quote"}), 413
+
+    table = RateTable.from_crop_details(store.get_crops(company_id, create=False))
+    try:
+        result = quote(table, lines)
+    except QuoteError as e:
+        return jsonify({"error": "Invalid quote lines", "details": e.errors[:100]}), 400
+    return jsonify(result), 200
+
+# ---------- Admin: background jobs ----------
+def _jobs_unavailable():
+    return jsonify({"error": "Background jobs need the MongoDB storage backend"}), 503
+
+def _validate_job_payload(job_type, payload):
+    try:
+        if job_type == "import_crops":
+            if isinstance(payload.get("crops"), list) and len(payload["crops"]) > JOB_IMPORT_MAX_ROWS:
+                return f"At most {JOB_IMPORT_MAX_ROWS} crops per import"
+            parse_import_payload(payload)
+        elif job_type == "reprice_crops":
+            parse_reprice_payload(payload)
+    except InvalidJob as e:
+        return str(e)
+    return None
+
+@app.route("/admin/jobs", methods=["POST"])
+@require_role("Admin")
+def create_job():
+    data = request.json or {}
+    job_type = data.get("type")
+    payload = data.get("payload") or {}
+
+    if job_queue is None:
+        return _jobs_unavailable()
+    if job_type not in JOB_TYPES:
+        return jsonify({"error": "Unknown job type"}), 400
+    if not isinstance(payload, dict):
+        return jsonify({"error": "payload must be an object"}), 400
+    err = _validate_job_payload(job_type, payload)
+    if err:
+        return jsonify({"error": err}), 400
+
+    job_id = db_call(job_queue.enqueue, job_type, request.user.get("company_id"), payload, created_by=request.user.get("username"))
+    return jsonify({"message": "Job queued", "id": job_id}), 202
+
+@app.route("/admin/jobs", methods=["GET"])
+@require_role("Admin")
+def list_jobs():
+    if job_queue is None:
+        return _jobs_unavailable()
+    items = db_call(job_queue.list, request.user.get("company_id"), status=request.args.get("status"))
+    return jsonify({"items": items}), 200
+
+@app.route("/admin/jobs/<job_id>", methods=["GET"])
+@require_role("Admin")
+def get_job(job_id):
+    if job_queue is None:
+        return _jobs_unavailable()
+    job = db_call(job_queue.get, request.user.get("company_id"), job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    job.pop("payload", None)
+    return jsonify(job), 200
+
+# ---------- Price board (Admin + Officer, read-only) ----------
+def _rebuild_and_announce(company_id):
+    version = db_call(price_boards.rebuild, company_id)
+    # Officers can get the new board from the snapshot cache even if the breaker opens before their first GET
+    snapshots.put(("price_board", company_id), version)
+    feed.publish(company_id, "price_board", "publish", version=version)
+    return version
+
+def publish_price_board(company_id):
+    # Runs after the crop mutation has committed; a failure here must not fail the request.
+    # The head is marked dirty so the next GET /api/price-board rebuilds it, and the
+    # rebuild is retried in the background in case nobody asks.
+    try:
+        return _rebuild_and_announce(company_id)
+    except Exception:
+        try:
+            db_call(price_boards.mark_dirty, company_id)
+        except Exception:
+            pass
+        board_retries.add(company_id)
+        return None
+
+def _price_board_response(board, immutable):
+    resp = make_response(jsonify(PriceBoards.view(board)))
+    resp.set_etag(board["version"])
+    if immutable:
+        resp.headers["Cache-Control"] = f"private, max-age={PRICE_BOARD_MAX_AGE}, immutable"
+    else:
+        resp.headers["Cache-Control"] = "private, no-cache"
+        resp.headers["Content-Location"] = f"/api/price-board/{board['version']}"
+    return resp
+
+@app.route("/api/price-board", methods=["GET"])
+@require_role("Admin", "Officer")
+def price_board_current():
+    company_id = request.user.get("company_id")
+    try:
+        version = flights.do(("price_board_heads", company_id), lambda: db_call(price_boards.current_version, company_id))
+        if version is None:
+            version = flights.do(("price_board_rebuild", company_id), lambda: db_call(price_boards.rebuild, company_id))
+        snapshots.put(("price_board", company_id), version)
+    except DatabaseUnavailable:
+        entry = snapshots.get(("price_board", company_id))
+        board = entry and price_boards.cached(company_id, entry[0])
+        if not board:
+            raise
+        return stale_response(PriceBoards.view(board), entry[1]), 200
+
+    if version in request.if_none_match:
+        resp = make_response("", 304)
+        resp.set_etag(version)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    board = price_boards.cached(company_id, version) or db_call(price_boards.get, company_id, version)
+    if not board:
+        return jsonify({"error": "Price board not found"}), 404
+    return _price_board_response(board, immutable=False), 200
+
+@app.route("/api/price-board/<version>", methods=["GET"])
+@require_role("Admin", "Officer")
+def price_board_version(version):
+    company_id = request.user.get("company_id")
+    if version in request.if_none_match:
+        # Versions are immutable, so a matching ETag is always still valid
+        resp = make_response("", 304)
+        resp.set_etag(version)
+        resp.headers["Cache-Control"] = f"private, max-age={PRICE_BOARD_MAX_AGE}, immutable"
+        return resp
+
+    board = price_boards.cached(company_id, version) or db_call(price_boards.get, company_id, version)
+    if not board:
+        return jsonify({"error": "Price board not found"}), 404
+    return _price_board_response(board, immutable=True), 200
+
+# ---------- Batch ----------
+# Endpoints that make no sense inside a batch: they set cookies, hold the
+# connection open, or authenticate on their own.
+BATCH_EXCLUDED = {
+    "batch", "event_stream", "admin_login", "officer_login", "auth_logout",
+    "create_company_admin", "issue_profile_token", "static",
+}
+BATCH_PARALLEL_METHODS = {"GET", "HEAD"}
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+def _run_subrequest(sub, principal, base_url):
+    headers = {}
+    if sub.get("if_none_match"):
+        headers["If-None-Match"] = sub["if_none_match"]
+    try:
+        # A fresh app context gives the sub-request its own `g`; the request context
+        # would otherwise reuse the batch's, and its profile/stale hooks would act on
+        # the outer request's state
+        with app.app_context(), app.test_request_context(
+            sub["path"],
+            base_url=base_url,
+            method=sub["method"],
+            json=sub.get("body"),
+            headers=headers,
+            environ_base={BATCH_PRINCIPAL_ENV: principal},
+        ):
+            resp = app.full_dispatch_request()
+            body = resp.get_json(silent=True)
+            if body is None and resp.status_code != 304:
+                body = resp.get_data(as_text=True)
+            out_headers = {k: resp.headers[k] for k in ("ETag", "X-Data-Stale") if k in resp.headers}
+    except Exception:
+        return {"id": sub.get("id"), "status": 500, "body": {"error": "Internal error"}}
+    return {"id": sub.get("id"), "status": resp.status_code, "headers": out_headers, "body": body}
+
+@app.route("/api/batch", methods=["POST"])
+@require_auth
+def batch():
+    data = request.json or {}
+    subs = data.get("requests")
+    if not isinstance(subs, list) or not subs:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(subs) > BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"At most {BATCH_MAX_REQUESTS} requests per batch"}), 400
+
+    adapter = app.url_map.bind("localhost")
+    results = [None] * len(subs)
+    runnable = []
+    for i, sub in enumerate(subs):
+        if not isinstance(sub, dict) or not str(sub.get("path") or "").startswith("/"):
+            results[i] = {"id": None, "status": 400, "body": {"error": "Each request needs a path starting with /"}}
+            continue
+        sub = dict(sub, method=str(sub.get("method") or "GET").upper())
+        try:
+            endpoint, _ = adapter.match(sub["path"].split("?", 1)[0], method=sub["method"])
+        except Exception:
+            results[i] = {"id": sub.get("id"), "status": 404, "body": {"error": "Not found"}}
+            continue
+        if endpoint in BATCH_EXCLUDED:
+            results[i] = {"id": sub.get("id"), "status": 400, "body": {"error": "Endpoint not allowed in batch"}}
+            continue
+        runnable.append((i, sub))
+
+    principal = dict(request.user)
+    base_url = request.host_url
+
+    # Consecutive reads run in parallel; a write waits for everything before it
+    # and everything after it waits for the write, so ordering is preserved.
+    wave = []
+    def flush_wave():
+        futures = [(i, batch_executor.submit(_run_subrequest, sub, principal, base_url)) for i, sub in wave]
+        for i, fut in futures:
+            results[i] = fut.result()
+        wave.clear()
+
+    for i, sub in runnable:
+        if sub["method"] in BATCH_PARALLEL_METHODS:
+            wave.append((i, sub))
+            continue
+        flush_wave()
+        results[i] = _run_subrequest(sub, principal, base_url)
+    flush_wave()
+
+    return jsonify({"responses": results}), 200
 
 if __name__ == '__main__':
     port = int(os.getenv("BACKEND_PORT", 5000))
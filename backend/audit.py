@@ -0,0 +1,160 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+
+# ---------- Audit event pipeline ----------
+# Request handlers call emit(), which only builds a small dict and drops it into
+# a bounded in-memory queue. A single background thread drains the queue and
+# writes events to an append-only collection in batches, so auditing never adds
+# a Mongo round trip to the request path. With no collection (non-Mongo
+# storage backends) emit() is a no-op.
+#
+# Events that fail to write go back on the queue, as far as it has room, and the
+# writer backs off before its next batch. An event only counts as failed after
+# max_attempts writes. Each event gets its _id before the first attempt, so a
+# retry of an insert that did land is rejected as a duplicate rather than
+# stored twice.
+class AuditWriter:
+    def __init__(self, collection, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 max_attempts=5, retry_backoff=0.5, max_backoff=30.0):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._attempts = {}   # _id -> failed writes so far, for events waiting on a retry
+        self._errors = 0      # consecutive failed batches, drives the backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def emit(self, action, company_id, actor=None, target=None, **details):
+        if self.collection is None:
+            return
+        event = {
+            "ts": datetime.utcnow(),
+            "action": action,
+            "company_id": company_id,
+            "actor": actor,
+            "target": target,
+        }
+        if details:
+            event["details"] = details
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Never block a request on auditing; count what we shed instead.
+            self.dropped += 1
+
+    def _drain(self, first=None):
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return True
+        for event in batch:
+            event.setdefault("_id", ObjectId())
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            retry = []
+        except BulkWriteError as e:
+            # Unordered: everything but the reported errors was inserted. Duplicate
+            # keys are events an earlier attempt already stored.
+            failed = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != 11000}
+            retry = [event for i, event in enumerate(batch) if i in failed]
+        except Exception:
+            retry = batch
+        self.written += len(batch) - len(retry)
+        pending = {event["_id"] for event in retry}
+        for event in batch:
+            if event["_id"] not in pending:
+                self._attempts.pop(event["_id"], None)
+        self._requeue(retry)
+        return not retry
+
+    def _requeue(self, events):
+        for event in events:
+            attempts = self._attempts.pop(event["_id"], 0) + 1
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                continue
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.failed += 1
+                continue
+            self._attempts[event["_id"]] = attempts
+            self.retried += 1
+
+    def _backoff(self):
+        return min(self.max_backoff, self.retry_backoff * 2 ** min(self._errors - 1, 16))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Give a burst a moment to accumulate so we write fewer, larger batches.
+            if self._queue.qsize() < self.batch_size:
+                time.sleep(min(0.05, self.flush_interval))
+            if self._write(self._drain(first)):
+                self._errors = 0
+            else:
+                self._errors += 1
+                self._stop.wait(self._backoff())
+        self.flush()
+
+    def flush(self):
+        # No backoff here: it runs at shutdown, and max_attempts bounds the retries
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout)
+        # Whatever the writer did not get to (or if it never started) is flushed here.
+        self.flush()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pymongo
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, PyMongoError, WTimeoutError
+
+
+# ---------- Circuit breaker ----------
+# Every database call goes through CircuitBreaker.call with a tight client-side
+# deadline. After `failure_threshold` consecutive infrastructure failures the
+# breaker opens and calls fail immediately with DatabaseUnavailable instead of
+# tying up a worker until the driver times out. After `reset_timeout` one trial
+# call is let through; success closes the breaker again.
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
+def _is_outage(exc):
+    # Duplicate keys, validation errors etc. are the caller's problem, not an outage.
+    return isinstance(exc, (ConnectionFailure, ExecutionTimeout, WTimeoutError)) or getattr(exc, "timeout", False)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, call_timeout=1.5):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            raise DatabaseUnavailable("Database circuit is open")
+
+    def _record(self, ok, probe):
+        with self._lock:
+            if probe:
+                self._probing = False
+            if ok:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if probe or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        probe = self._before_call()
+        try:
+            with pymongo.timeout(self.call_timeout):
+                result = fn(*args, **kwargs)
+        except PyMongoError as e:
+            if _is_outage(e):
+                self._record(False, probe)
+                raise DatabaseUnavailable(str(e)) from e
+            self._record(True, probe)
+            raise
+        except BaseException:
+            if probe:
+                with self._lock:
+                    self._probing = False
+            raise
+        self._record(True, probe)
+        return result
+
+    @property
+    def is_open(self):
+        return self.state != CLOSED
+
+    def stats(self):
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+# ---------- Last-known-good snapshots ----------
+# Read endpoints remember their last successful result per company. While the
+# breaker is open they serve that copy (flagged stale) and ask a small
+# background pool to refresh it, which doubles as the breaker's trial call.
+# Besides the entry count, memory is bounded by weight: a list (roster, crop
+# catalog) weighs its length, anything else weighs 1.
+class SnapshotCache:
+    def __init__(self, max_entries=5000, revalidate_workers=2, max_weight=200000):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weight = 0
+        self._data = OrderedDict()
+        self._weights = {}
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=revalidate_workers, thread_name_prefix="snapshot")
+
+    def put(self, key, value, weight=None):
+        if weight is None:
+            weight = len(value) if isinstance(value, (list, tuple)) else 1
+        if self.max_weight and weight > self.max_weight:
+            self.discard(key)   # would evict everything else; drop the older copy too
+            return
+        with self._lock:
+            self.weight += weight - self._weights.get(key, 0)
+            self._weights[key] = weight
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries or (self.max_weight and self.weight > self.max_weight):
+                evicted, _ = self._data.popitem(last=False)
+                self.weight -= self._weights.pop(evicted)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def discard(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.weight -= self._weights.pop(key)
+
+    def revalidate(self, key, loader):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        def task():
+            try:
+                value = loader()
+                if value is not None:
+                    self.put(key, value)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(task)
+
+    def serve_stale(self, key, loader):
+        # Returns (value, stored_at) or None; schedules a refresh either way.
+        entry = self.get(key)
+        self.revalidate(key, loader)
+        return entry
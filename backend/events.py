@@ -0,0 +1,214 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from pymongo import CursorType, ReturnDocument
+from pymongo.errors import CollectionInvalid
+
+
+# ---------- Change feed ----------
+# Mutations publish a small event into a capped collection. Each worker process
+# runs ONE listener thread that tails that collection and fans events out to
+# in-memory queues, one per open stream, so a thousand connected dashboards
+# cost one tailable cursor rather than a thousand database queries.
+#
+# Without a database (db=None) the feed is process-local: events get ids from an
+# in-memory counter, are kept in a bounded history for replay and are dispatched
+# straight to subscribers. That only reaches streams served by the same process.
+#
+# `call` wraps publish's database round trips (the app passes its circuit
+# breaker), so a notification is skipped rather than waited on while the
+# database is slow or down.
+def _direct(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+class ChangeFeed:
+    def __init__(self, db, name="change_events", capped_bytes=16 * 1024 * 1024,
+                 heartbeat=15.0, subscriber_queue=1000, local_history=4096, call=None):
+        self.db = db
+        self.call = call or _direct
+        self.name = name
+        self.capped_bytes = capped_bytes
+        self.heartbeat = heartbeat
+        self.subscriber_queue = subscriber_queue
+        self.collection = db[name] if db is not None else None
+        self.counters = db.counters if db is not None else None
+        self._history = deque(maxlen=local_history)
+        self._seq = 0
+        self._subscribers = {}   # company_id -> set of queues
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = False
+
+    def _ensure_collection(self):
+        if self._ready:
+            return
+        try:
+            self.db.create_collection(self.name, capped=True, size=self.capped_bytes)
+        except CollectionInvalid:
+            pass
+        self._ready = True
+
+    def _next_id(self):
+        doc = self.counters.find_one_and_update(
+            {"_id": self.name}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return doc["seq"]
+
+    def publish(self, company_id, kind, op, **data):
+        # Best effort: a failed notification must never fail the mutation that already committed.
+        if self.collection is None:
+            return self._publish_local(company_id, kind, op, data)
+        try:
+            return self.call(self._insert, company_id, kind, op, data)
+        except Exception:
+            return None
+
+    def _insert(self, company_id, kind, op, data):
+        # Both round trips share one deadline when `call` sets one
+        self._ensure_collection()
+        event = {"_id": self._next_id(), "company_id": company_id, "kind": kind,
+                 "op": op, "data": data, "ts": datetime.utcnow()}
+        self.collection.insert_one(event)
+        return event["_id"]
+
+    def _publish_local(self, company_id, kind, op, data):
+        with self._lock:
+            self._seq += 1
+            event = {"_id": self._seq, "company_id": company_id, "kind": kind,
+                     "op": op, "data": data, "ts": datetime.utcnow()}
+            self._history.append(event)
+        self._dispatch(event)
+        return event["_id"]
+
+    # ----- listener / fan-out -----
+    def _start(self):
+        if self.collection is None:
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._listen, name="change-feed", daemon=True)
+            self._thread.start()
+
+    def _dispatch(self, event):
+        with self._lock:
+            targets = list(self._subscribers.get(event["company_id"], ()))
+        for q in targets:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Subscriber is too slow; end its stream so it reconnects and replays.
+                self._drop(event["company_id"], q)
+
+    def _listen(self):
+        start = last_seen = None
+        recent = deque(maxlen=4096)
+        recent_ids = set()
+        while True:
+            try:
+                self._ensure_collection()
+                if start is None:
+                    # Only events published after this worker started listening are pushed
+                    newest = self.collection.find_one(sort=[("$natural", -1)])
+                    start = last_seen = newest["_id"] if newest else 0
+                # Ids are allocated before insert, so two publishers can land slightly
+                # out of order; re-read a window behind the last id and de-duplicate.
+                floor = max(start, last_seen - 64)
+                cursor = self.collection.find({"_id": {"$gt": floor}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for event in cursor:
+                        if event["_id"] in recent_ids:
+                            continue
+                        if len(recent) == recent.maxlen:
+                            recent_ids.discard(recent[0])
+                        recent.append(event["_id"])
+                        recent_ids.add(event["_id"])
+                        last_seen = max(last_seen, event["_id"])
+                        self._dispatch(event)
+                    if not self.has_subscribers():
+                        break
+            except Exception:
+                pass
+            if not self.has_subscribers():
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+            time.sleep(0.5)
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def subscribe(self, company_id):
+        q = queue.Queue(maxsize=self.subscriber_queue)
+        with self._lock:
+            self._subscribers.setdefault(company_id, set()).add(q)
+        self._start()
+        return q
+
+    def _drop(self, company_id, q):
+        with self._lock:
+            subs = self._subscribers.get(company_id)
+            if subs and q in subs:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[company_id]
+                with q.mutex:
+                    q.queue.clear()
+                    q.queue.append(None)
+                    q.not_empty.notify()
+
+    def unsubscribe(self, company_id, q):
+        with self._lock:
+            subs = self._subscribers.get(company_id)
+            if subs:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[company_id]
+
+    def replay(self, company_id, after_id, kinds=None, limit=1000):
+        if self.collection is None:
+            with self._lock:
+                events = [e for e in self._history if e["company_id"] == company_id and e["_id"] > after_id
+                          and (not kinds or e["kind"] in kinds)]
+            return events[:limit]
+        query = {"company_id": company_id, "_id": {"$gt": after_id}}
+        if kinds:
+            query["kind"] = {"$in": list(kinds)}
+        return list(self.collection.find(query).sort("_id", 1).limit(limit))
+
+    # ----- SSE framing -----
+    @staticmethod
+    def format(event):
+        payload = dict(event.get("data") or {}, op=event["op"], ts=event["ts"])
+        data = json.dumps(payload, default=str)
+        return f"id: {event['_id']}\nevent: {event['kind']}\ndata: {data}\n\n"
+
+    def stream(self, company_id, last_event_id=None, kinds=None):
+        q = self.subscribe(company_id)
+        try:
+            yield "retry: 3000\n\n"
+            replayed = set()
+            if last_event_id is not None:
+                for event in self.replay(company_id, last_event_id, kinds):
+                    replayed.add(event["_id"])
+                    yield self.format(event)
+            while True:
+                try:
+                    event = q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                if event["_id"] in replayed or (kinds and event["kind"] not in kinds):
+                    continue
+                yield self.format(event)
+        finally:
+            self.unsubscribe(company_id, q)
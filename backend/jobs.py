@@ -0,0 +1,205 @@
+import math
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+
+# ---------- Background job queue ----------
+# Jobs are documents in the `jobs` collection. A worker claims one with a single
+# find_one_and_update that flips it to "running" and stamps a lease; if the
+# worker dies, the lease expires and another worker picks the job up again.
+# Failures are retried with exponential backoff until max_attempts.
+JOB_TYPES = {"import_crops", "reprice_crops"}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class InvalidJob(Exception):
+    # The payload itself is wrong: retrying cannot help, so the job fails at once
+    pass
+
+
+# ---------- Payload parsing (shared by POST /admin/jobs and the worker) ----------
+def _rate(value):
+    rate = float(value)
+    if not math.isfinite(rate) or rate < 0:
+        raise ValueError("Rate per unit must be positive")
+    return rate
+
+
+def parse_import_payload(payload):
+    # {"crops": [{"crop_name", "rate_per_unit"}, ...]} -> {lowercased name: (name, rate)}; the last row for a name wins
+    rows = payload.get("crops")
+    if not isinstance(rows, list) or not rows:
+        raise InvalidJob("crops must be a non-empty list")
+    parsed = {}
+    for n, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise InvalidJob(f"Row {n}: must be an object")
+        name = row.get("crop_name")
+        if not isinstance(name, str) or not name.strip():
+            raise InvalidJob(f"Row {n}: crop_name is required")
+        try:
+            parsed[name.strip().lower()] = (name.strip(), _rate(row.get("rate_per_unit")))
+        except (ValueError, TypeError) as e:
+            raise InvalidJob(f"Row {n}: {e}")
+    return parsed
+
+
+def parse_reprice_payload(payload):
+    # {"percent": 4.0, "prefix": "Tur"} -> (4.0, "tur")
+    try:
+        percent = float(payload.get("percent"))
+    except (ValueError, TypeError):
+        raise InvalidJob("percent is required")
+    if not math.isfinite(percent) or percent <= -100:
+        raise InvalidJob("percent must be greater than -100")
+    prefix = payload.get("prefix") or ""
+    if not isinstance(prefix, str):
+        raise InvalidJob("prefix must be a string")
+    return percent, prefix.strip().lower()
+
+
+class JobQueue:
+    def __init__(self, collection, lease_seconds=60, tenant_concurrency=2,
+                 backoff_base=5, backoff_max=600):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.tenant_concurrency = tenant_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def ensure_indexes(self):
+        self.collection.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
+        self.collection.create_index([("company_id", ASCENDING), ("created_at", DESCENDING)])
+
+    def enqueue(self, job_type, company_id, payload=None, created_by=None, max_attempts=5):
+        now = datetime.utcnow()
+        job = {
+            "_id": str(ObjectId()),
+            "type": job_type,
+            "company_id": company_id,
+            "payload": payload or {},
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now,
+            "lease_expires_at": None,
+            "worker_id": None,
+            "progress": {"done": 0, "total": None, "message": None},
+            "result": None,
+            "error": None,
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.collection.insert_one(job)
+        return job["_id"]
+
+    def _running_count(self, company_id, now):
+        return self.collection.count_documents(
+            {"company_id": company_id, "status": RUNNING, "lease_expires_at": {"$gt": now}}
+        )
+
+    def reap(self):
+        # Jobs whose lease expired on their final attempt will never be claimed again.
+        now = datetime.utcnow()
+        return self.collection.update_many(
+            {"status": RUNNING, "lease_expires_at": {"$lte": now},
+             "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": FAILED, "error": "Lease expired", "updated_at": now, "worker_id": None}},
+        ).modified_count
+
+    def claim(self, worker_id, types=None):
+        saturated = set()
+        while True:
+            now = datetime.utcnow()
+            query = {
+                "$or": [
+                    {"status": QUEUED, "run_at": {"$lte": now}},
+                    {"status": RUNNING, "lease_expires_at": {"$lte": now},
+                     "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+                ],
+            }
+            if types:
+                query["type"] = {"$in": list(types)}
+            if saturated:
+                query["company_id"] = {"$nin": list(saturated)}
+            job = self.collection.find_one_and_update(
+                query,
+                {"$set": {"status": RUNNING, "worker_id": worker_id, "updated_at": now,
+                          "lease_expires_at": now + timedelta(seconds=self.lease_seconds)},
+                 "$inc": {"attempts": 1}},
+                sort=[("run_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                return None
+            if self.tenant_concurrency and self._running_count(job["company_id"], now) > self.tenant_concurrency:
+                # Tenant is at its limit: hand the job back untouched and look at other tenants.
+                self.collection.update_one(
+                    {"_id": job["_id"], "worker_id": worker_id},
+                    {"$set": {"status": QUEUED, "worker_id": None, "lease_expires_at": None,
+                              "run_at": now + timedelta(seconds=1)},
+                     "$inc": {"attempts": -1}},
+                )
+                saturated.add(job["company_id"])
+                continue
+            return job
+
+    def progress(self, job, done, total=None, message=None):
+        # Doubles as the lease heartbeat; a worker that lost its lease must stop.
+        now = datetime.utcnow()
+        res = self.collection.update_one(
+            {"_id": job["_id"], "status": RUNNING, "worker_id": job["worker_id"]},
+            {"$set": {"progress": {"done": done, "total": total, "message": message},
+                      "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                      "updated_at": now}},
+        )
+        if res.matched_count == 0:
+            raise LeaseLost(job["_id"])
+
+    def save_plan(self, job, plan):
+        # Work a handler decided on its first attempt; retries read it back from job["plan"]
+        res = self.collection.update_one(
+            {"_id": job["_id"], "status": RUNNING, "worker_id": job["worker_id"]},
+            {"$set": {"plan": plan, "updated_at": datetime.utcnow()}},
+        )
+        if res.matched_count == 0:
+            raise LeaseLost(job["_id"])
+        job["plan"] = plan
+
+    def complete(self, job, result=None):
+        self.collection.update_one(
+            {"_id": job["_id"], "worker_id": job["worker_id"]},
+            {"$set": {"status": SUCCEEDED, "result": result, "error": None,
+                      "lease_expires_at": None, "updated_at": datetime.utcnow()}},
+        )
+
+    def fail(self, job, error, retry=True):
+        now = datetime.utcnow()
+        update = {"error": str(error)[:2000], "lease_expires_at": None, "worker_id": None, "updated_at": now}
+        if not retry or job["attempts"] >= job["max_attempts"]:
+            update["status"] = FAILED
+        else:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (job["attempts"] - 1))
+            update.update(status=QUEUED, run_at=now + timedelta(seconds=delay))
+        self.collection.update_one({"_id": job["_id"], "worker_id": job["worker_id"]}, {"$set": update})
+
+    def get(self, company_id, job_id):
+        return self.collection.find_one({"_id": job_id, "company_id": company_id}, {"worker_id": 0, "plan": 0})
+
+    def list(self, company_id, status=None, limit=50):
+        query = {"company_id": company_id}
+        if status:
+            query["status"] = status
+        return list(self.collection.find(query, {"payload": 0, "worker_id": 0, "plan": 0})
+                    .sort("created_at", DESCENDING).limit(limit))
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+
+# ---------- Officer price board ----------
+# A price board is an immutable, content-addressed snapshot of a company's
+# rates: the version is a hash of the rates themselves, so a given
+# (company_id, version) never changes and can be cached forever by browsers,
+# proxies and this process. A small per-company head document points at the
+# current version and is only rewritten when a crop mutation commits.
+#
+# Two rebuilds can race, and the one that read the older catalog may finish
+# last. Each rebuild therefore takes a revision from the head before reading the
+# catalog, and the head only moves to a higher revision. The rebuild triggered
+# by the latest mutation always draws the highest revision and reads after that
+# mutation committed, so the head converges on the newest catalog.
+#
+# If that rebuild fails, the caller marks the head dirty: current_version()
+# then reports no head, so the next read rebuilds instead of serving old rates.
+# Superseded boards are pruned down to the newest `keep_versions` per company.
+#
+# load_catalog(company_id) -> crop_details lets the boards follow whichever
+# storage backend holds the catalog. Without a database (db=None) heads and
+# current boards are kept in this process only.
+def build_items(crop_details):
+    items = [{"crop_name": c["crop_name"], "rate_per_unit": c["rate_per_unit"]} for c in crop_details]
+    items.sort(key=lambda c: c["crop_name"].lower())
+    return items
+
+
+def board_version(items):
+    canonical = json.dumps(items, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class PriceBoards:
+    def __init__(self, db, cache_size=1000, load_catalog=None, keep_versions=20):
+        self.boards = db.price_boards if db is not None else None       # immutable snapshots, _id = "<company_id>:<version>"
+        self.heads = db.price_board_heads if db is not None else None   # one doc per company: current version
+        self.crops = db.crops if db is not None else None
+        self.load_catalog = load_catalog or self._load_from_mongo
+        self.cache_size = cache_size
+        self.keep_versions = keep_versions
+        self._indexed = False
+        self._local_dirty = set()              # companies whose local head is out of date, when db is None
+        self._local_heads = {}                 # company_id -> (revision, current board), when db is None
+        self._local_revisions = {}             # company_id -> last revision handed out, when db is None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, board):
+        key = (board["company_id"], board["version"])
+        with self._lock:
+            self._cache[key] = board
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load_from_mongo(self, company_id):
+        crop_doc = self.crops.find_one({"company_id": company_id}, {"crop_details.crop_name": 1, "crop_details.rate_per_unit": 1})
+        return (crop_doc or {}).get("crop_details", [])
+
+    def _next_revision(self, company_id):
+        if self.heads is None:
+            with self._lock:
+                revision = self._local_revisions[company_id] = self._local_revisions.get(company_id, 0) + 1
+            return revision
+        head = self.heads.find_one_and_update(
+            {"_id": company_id},
+            {"$inc": {"next_revision": 1}, "$setOnInsert": {"company_id": company_id}},
+            projection={"next_revision": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return head["next_revision"]
+
+    def rebuild(self, company_id):
+        # Always rebuilt from the committed catalog, never from a caller's in-memory copy.
+        # Returns the version at the head afterwards, which is a newer one if this rebuild lost a race.
+        revision = self._next_revision(company_id)
+        items = build_items(self.load_catalog(company_id))
+        version = board_version(items)
+        now = datetime.utcnow()
+        board = {
+            "_id": f"{company_id}:{version}",
+            "company_id": company_id,
+            "version": version,
+            "items": items,
+            "built_at": now,
+        }
+        if self.boards is None:
+            with self._lock:
+                head_revision, head = self._local_heads.get(company_id, (0, None))
+                if revision > head_revision:
+                    if head is not None and head["version"] == version:
+                        board = head   # same rates: keep the original built_at
+                    self._local_heads[company_id] = (revision, board)
+                    self._local_dirty.discard(company_id)
+                else:
+                    board = head
+            self._remember(board)
+            return board["version"]
+        inserted = self.boards.update_one({"_id": board["_id"]}, {"$setOnInsert": board}, upsert=True).upserted_id
+        self._remember(board)
+        res = self.heads.update_one(
+            {"_id": company_id, "$or": [{"revision": {"$lt": revision}}, {"revision": {"$exists": False}}]},
+            {"$set": {"version": version, "revision": revision, "dirty": False, "updated_at": now}},
+        )
+        head = version if res.matched_count else (self.current_version(company_id) or version)
+        if inserted is not None:
+            self._prune(company_id, {version, head})
+        return head
+
+    def _prune(self, company_id, keep):
+        # Only runs when a new board was stored, so it costs one indexed query per rate change
+        if not self.keep_versions:
+            return
+        if not self._indexed:
+            self.boards.create_index([("company_id", 1), ("built_at", -1)])
+            self._indexed = True
+        old = self.boards.find({"company_id": company_id}, {"version": 1}).sort("built_at", -1).skip(self.keep_versions)
+        ids = [b["_id"] for b in old if b["version"] not in keep]
+        if ids:
+            self.boards.delete_many({"_id": {"$in": ids}})
+
+    def mark_dirty(self, company_id):
+        # The catalog changed but its board could not be rebuilt: make the next read rebuild it
+        if self.heads is None:
+            with self._lock:
+                self._local_dirty.add(company_id)
+            return
+        self.heads.update_one({"_id": company_id}, {"$set": {"dirty": True}}, upsert=True)
+
+    def current_version(self, company_id):
+        if self.heads is None:
+            head = self._local_heads.get(company_id)
+            return head[1]["version"] if head and company_id not in self._local_dirty else None
+        head = self.heads.find_one({"_id": company_id}, {"version": 1, "dirty": 1})
+        return head.get("version") if head and not head.get("dirty") else None
+
+    def cached(self, company_id, version):
+        with self._lock:
+            return self._cache.get((company_id, version))
+
+    def get(self, company_id, version):
+        board = self.cached(company_id, version)
+        if board is not None:
+            return board
+        if self.boards is None:
+            head = self._local_heads.get(company_id)
+            return head[1] if head and head[1]["version"] == version else None
+        board = self.boards.find_one({"_id": f"{company_id}:{version}"})
+        if board is not None:
+            self._remember(board)
+        return board
+
+    @staticmethod
+    def view(board):
+        return {
+            "version": board["version"],
+            "built_at": board["built_at"],
+            "items": board["items"],
+        }
+
+
+# ---------- Rebuild retries ----------
+# Companies whose board could not be rebuilt after a committed mutation. One
+# background thread retries them every `interval` seconds until they succeed,
+# so a brief outage does not leave officers on old rates until the next edit.
+class RebuildRetrier:
+    def __init__(self, publish, interval=5.0):
+        self.publish = publish          # company_id -> None; raises to be retried later
+        self.interval = interval
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.retried = 0
+        self.failures = 0
+
+    def add(self, company_id):
+        with self._lock:
+            self._pending.add(company_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="price-board-retry", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                batch = list(self._pending)
+                # Taken out before the attempt, so a failure recorded meanwhile is retried again
+                self._pending.clear()
+                if not batch:
+                    self._thread = None
+                    return
+            for company_id in batch:
+                try:
+                    self.publish(company_id)
+                    self.retried += 1
+                except Exception:
+                    self.failures += 1
+                    with self._lock:
+                        self._pending.add(company_id)
+
+    def stats(self):
+        with self._lock:
+            return {"pending": len(self._pending), "retried": self.retried, "failures": self.failures}
@@ -0,0 +1,161 @@
+import argparse
+import math
+import operator
+import random
+import time
+from array import array
+
+
+# ---------- Bulk quote engine ----------
+# The company's crop catalog is flattened into a column-oriented rate table
+# (names + a packed float array), and a batch of quote lines is parsed into
+# parallel columns once. Pricing is then a handful of whole-column passes with
+# C-level map(operator.*) instead of per-line Python arithmetic.
+class QuoteError(ValueError):
+    def __init__(self, errors):
+        super().__init__("Invalid quote lines")
+        self.errors = errors
+
+
+class RateTable:
+    def __init__(self, names, rates):
+        self.names = names
+        self.rates = rates
+        self.index = {name.lower(): i for i, name in enumerate(names)}
+
+    @classmethod
+    def from_crop_details(cls, crop_details):
+        names = []
+        rates = array("d")
+        for crop in crop_details:
+            names.append(crop["crop_name"])
+            rates.append(float(crop["rate_per_unit"]))
+        return cls(names, rates)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def _number(value, field, line_no, errors, default=None):
+    if value is None:
+        if default is None:
+            errors.append({"line": line_no, "error": f"{field} is required"})
+        return default
+    try:
+        value = float(value)
+    except (ValueError, TypeError):
+        errors.append({"line": line_no, "error": f"Invalid {field}"})
+        return default
+    if not math.isfinite(value) or value < 0:
+        errors.append({"line": line_no, "error": f"{field} must be positive"})
+        return default
+    return value
+
+
+def parse_lines(table, lines):
+    # Validate everything up front; a quote is all-or-nothing.
+    idx = array("l")
+    qty = array("d")
+    keep = array("d")
+    errors = []
+    lookup = table.index
+    for n, line in enumerate(lines):
+        if not isinstance(line, dict):
+            errors.append({"line": n, "error": "Line must be an object"})
+            continue
+        name = (line.get("crop_name") or "").strip()
+        i = lookup.get(name.lower())
+        if i is None:
+            errors.append({"line": n, "error": f"Unknown crop: {name}" if name else "crop_name is required"})
+        q = _number(line.get("quantity"), "quantity", n, errors)
+        moisture = _number(line.get("moisture_pct"), "moisture_pct", n, errors, default=0.0)
+        grade = _number(line.get("grade_pct"), "grade_pct", n, errors, default=0.0)
+        deduction = moisture + grade
+        if deduction > 100:
+            errors.append({"line": n, "error": "Total deductions cannot exceed 100%"})
+        if i is None or q is None:
+            continue
+        idx.append(i)
+        qty.append(q)
+        keep.append(1.0 - deduction / 100.0)
+    if errors:
+        raise QuoteError(errors)
+    return idx, qty, keep
+
+
+def price(table, idx, qty, keep):
+    rates = array("d", map(table.rates.__getitem__, idx))
+    net = array("d", map(operator.mul, qty, keep))
+    amounts = array("d", map(operator.mul, net, rates))
+    return rates, net, amounts
+
+
+def quote(table, lines, round_to=2):
+    idx, qty, keep = parse_lines(table, lines)
+    rates, net, amounts = price(table, idx, qty, keep)
+    total_quantity, total_amount = sum(qty), sum(amounts)
+    if not (math.isfinite(total_quantity) and math.isfinite(total_amount)):
+        # Finite inputs can still overflow, and Infinity is not valid JSON
+        raise QuoteError([{"line": None, "error": "Quote total is too large"}])
+    names = table.names
+    items = [
+        {
+            "crop_name": names[i],
+            "quantity": q,
+            "deduction_pct": round((1.0 - k) * 100, 4),
+            "net_quantity": round(nq, 4),
+            "rate_per_unit": r,
+            "amount": round(a, round_to),
+        }
+        for i, q, k, nq, r, a in zip(idx, qty, keep, net, rates, amounts)
+    ]
+    return {
+        "items": items,
+        "line_count": len(items),
+        "total_quantity": round(total_quantity, 4),
+        "total_net_quantity": round(sum(net), 4),
+        "total_amount": round(total_amount, round_to),
+    }
+
+
+def benchmark(n_lines=100000, n_crops=2000, seed=1):
+    rng = random.Random(seed)
+    details = [{"crop_name": f"Crop {i}", "rate_per_unit": rng.uniform(10, 9000)} for i in range(n_crops)]
+    lines = [
+        {
+            "crop_name": f"crop {rng.randrange(n_crops)}",
+            "quantity": rng.uniform(1, 500),
+            "moisture_pct": rng.choice([None, rng.uniform(0, 8)]),
+            "grade_pct": rng.choice([None, rng.uniform(0, 3)]),
+        }
+        for _ in range(n_lines)
+    ]
+
+    t0 = time.perf_counter()
+    table = RateTable.from_crop_details(details)
+    t1 = time.perf_counter()
+    idx, qty, keep = parse_lines(table, lines)
+    t2 = time.perf_counter()
+    price(table, idx, qty, keep)
+    t3 = time.perf_counter()
+    quote(table, lines)
+    t4 = time.perf_counter()
+    return {
+        "lines": n_lines,
+        "crops": n_crops,
+        "table_build_ms": round((t1 - t0) * 1000, 3),
+        "parse_ms": round((t2 - t1) * 1000, 3),
+        "price_ms": round((t3 - t2) * 1000, 3),
+        "quote_ms": round((t4 - t3) * 1000, 3),
+        "lines_per_sec": round(n_lines / (t4 - t3)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the bulk quote engine")
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--crops", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for key, value in benchmark(args.lines, args.crops, args.seed).items():
+        print(f"{key:>16}: {value}")
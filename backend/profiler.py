@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# ---------- Per-request sampling profiler ----------
+# A profiled request gets a sampler thread that snapshots the request thread's
+# stack every few milliseconds. Stacks are written in the "folded" format that
+# flamegraph.pl / speedscope / inferno read directly, and each sample is also
+# attributed to a coarse category so a slow request can be explained at a glance.
+CATEGORIES = ("jwt", "mongo", "bcrypt", "serialization", "handler", "framework")
+MAX_FILE_LABEL = 80   # profile ids become file names, which most filesystems cap at 255 bytes
+
+_FUNCTION_CATEGORIES = {
+    "hash_password": "bcrypt",
+    "check_password": "bcrypt",
+    "jwt_verify": "jwt",
+    "jwt_issue_for_employee": "jwt",
+}
+
+
+def _frame_category(frame):
+    code = frame.f_code
+    name = _FUNCTION_CATEGORIES.get(code.co_name)
+    if name:
+        return name
+    path = code.co_filename.replace("\\", "/")
+    if "/bcrypt/" in path:
+        return "bcrypt"
+    if "/jwt/" in path:
+        return "jwt"
+    if "/pymongo/" in path or "/bson/" in path:
+        return "mongo"
+    if "/json/" in path:
+        return "serialization"
+    return None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}:{code.co_firstlineno}".replace(";", ",")
+
+
+def _file_label(label):
+    # Long labels (a path with a long crop name) are cut short and keep a hash so they stay distinct
+    if len(label) <= MAX_FILE_LABEL:
+        return label
+    digest = hashlib.sha1(label.encode("utf-8")).hexdigest()[:10]
+    return f"{label[:MAX_FILE_LABEL - 11]}-{digest}"
+
+
+class ProfileSession:
+    def __init__(self, profiler, label, thread_id):
+        self.profiler = profiler
+        self.label = label
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        labels = []
+        category = None
+        in_app = False
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if category is None:
+                category = _frame_category(frame)
+            path = frame.f_code.co_filename
+            if path.startswith(self.profiler.app_root) and "site-packages" not in path:
+                in_app = True
+            frame = frame.f_back
+        if category is None:
+            category = "handler" if in_app else "framework"
+        labels.reverse()
+        self.stacks[";".join(labels)] += 1
+        self.categories[category] += 1
+        self.samples += 1
+
+    def _run(self):
+        interval = self.profiler.interval
+        while not self._stop.wait(interval):
+            self._sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self.breakdown()
+
+    def breakdown(self):
+        # Scale sample counts to wall time so the categories add up to the request duration.
+        total = self.samples or 1
+        return {c: round(self.elapsed * 1000 * self.categories.get(c, 0) / total, 3) for c in CATEGORIES}
+
+
+class RequestProfiler:
+    def __init__(self, output_dir, interval=0.002, max_files=200, sample_rate=0.0, app_root=None):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_files = max_files
+        self.sample_rate = sample_rate
+        self.app_root = app_root or os.path.dirname(os.path.abspath(__file__))
+        self._lock = threading.Lock()
+
+    def start(self, label):
+        return ProfileSession(self, label, threading.get_ident()).start()
+
+    def finish(self, session):
+        breakdown = session.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        profile_id = f"{stamp}-{int(time.time() * 1000) % 1000:03d}-{os.getpid()}-{_file_label(session.label)}"
+        base = os.path.join(self.output_dir, profile_id)
+        with open(base + ".folded", "w") as fh:
+            for stack, count in session.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+        with open(base + ".json", "w") as fh:
+            json.dump({
+                "id": profile_id,
+                "label": session.label,
+                "elapsed_ms": round(session.elapsed * 1000, 3),
+                "samples": session.samples,
+                "interval_ms": self.interval * 1000,
+                "breakdown_ms": breakdown,
+            }, fh)
+        self._prune()
+        return profile_id, breakdown
+
+    def _prune(self):
+        # Retention is bounded by profile count; each profile is a .folded/.json pair.
+        with self._lock:
+            try:
+                names = [n for n in os.listdir(self.output_dir) if n.endswith(".json")]
+            except FileNotFoundError:
+                return
+            if len(names) <= self.max_files:
+                return
+            paths = sorted((os.path.join(self.output_dir, n) for n in names), key=os.path.getmtime)
+            for path in paths[: len(paths) - self.max_files]:
+                for p in (path, path[: -len(".json")] + ".folded"):
+                    try:
+                        os.remove(p)
+                    except FileNotFoundError:
+                        pass
+
+
+def server_timing(breakdown):
+    return ", ".join(f"{name};dur={ms}" for name, ms in breakdown.items() if ms)
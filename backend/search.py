@@ -0,0 +1,405 @@
+import argparse
+import bisect
+import heapq
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from priceboard import board_version, build_items
+from singleflight import Group
+
+
+# ---------- Crop name search ----------
+# One index per company, built once from the catalog and then patched by the
+# crop handlers on every add/update/delete. Three tiers, best first:
+#   exact / prefix of the whole name  -> bisect over sorted normalized names
+#   every query word prefixes a word  -> bisect over sorted (word, id) pairs
+#   typo-tolerant                     -> query words matched against the
+#                                        catalog's vocabulary by trigram overlap
+# Fuzzy matching runs against distinct words rather than whole names, so its
+# cost follows the vocabulary size, not the catalog size. Writes from other
+# processes (other workers, bulk jobs) are caught by comparing the index's
+# digest with the price board head version: the same hash over the same catalog.
+WORD_RE = re.compile(r"[^\W_]+")
+FUZZY_MIN_SIMILARITY = 0.4
+SHORT_TOKEN = 4
+
+
+def normalize(name):
+    # "Soyabean (yellow, FAQ)" -> "soyabean yellow faq"
+    return " ".join(WORD_RE.findall(name.lower()))
+
+
+def trigrams(word):
+    # pg_trgm style padding: two leading blanks, one trailing
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _one_edit_apart(a, b):
+    # One substitution, insertion, deletion or adjacent transposition
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+
+
+def _prefix_range(pairs, prefix):
+    lo = bisect.bisect_left(pairs, (prefix,))
+    hi = bisect.bisect_left(pairs, (prefix + "\U0010ffff",))
+    return lo, hi
+
+
+def _word_range(pairs, word):
+    # (word,) < (word, id) < (word + "\0",) for every id
+    return bisect.bisect_left(pairs, (word,)), bisect.bisect_left(pairs, (word + "\0",))
+
+
+class CropIndex:
+    def __init__(self, crop_details):
+        self.lock = threading.Lock()
+        self.entries = {}    # id -> {"crop_name", "rate_per_unit"}
+        self.ids = {}        # exact crop_name -> id
+        self.keys = {}       # id -> (len(normalized), normalized): shorter names rank first
+        self.names = []      # sorted (normalized name, id)
+        self.words = []      # sorted (word, id)
+        self.vocab = {}      # word -> number of names using it
+        self.vocab_grams = defaultdict(set)   # trigram -> words
+        self._next_id = 0
+        for crop in crop_details:
+            self._insert(crop, sort=False)
+        self.names.sort()
+        self.words.sort()
+        self.version = board_version(build_items(crop_details))
+        self.dirty = False
+        self.checked_at = time.monotonic()
+        self.built_for = None   # head version that triggered this build, if any
+
+    # ----- maintenance -----
+    def _insert(self, crop, sort=True):
+        cid = self._next_id
+        self._next_id += 1
+        name = crop["crop_name"]
+        norm = normalize(name)
+        self.entries[cid] = {"crop_name": name, "rate_per_unit": crop["rate_per_unit"]}
+        self.ids[name] = cid
+        self.keys[cid] = (len(norm), norm)
+        words = set(norm.split())
+        for word in words:
+            count = self.vocab.get(word, 0)
+            if not count:
+                for gram in trigrams(word):
+                    self.vocab_grams[gram].add(word)
+            self.vocab[word] = count + 1
+        if sort:
+            bisect.insort(self.names, (norm, cid))
+            for word in words:
+                bisect.insort(self.words, (word, cid))
+        else:
+            self.names.append((norm, cid))
+            self.words.extend((word, cid) for word in words)
+
+    def _delete(self, name):
+        cid = self.ids.pop(name, None)
+        if cid is None:
+            return
+        del self.entries[cid]
+        norm = self.keys.pop(cid)[1]
+        words = set(norm.split())
+        for word in words:
+            self.vocab[word] -= 1
+            if not self.vocab[word]:
+                del self.vocab[word]
+                for gram in trigrams(word):
+                    self.vocab_grams[gram].discard(word)
+                    if not self.vocab_grams[gram]:
+                        del self.vocab_grams[gram]
+        for pairs, key in [(self.names, norm)] + [(self.words, word) for word in words]:
+            i = bisect.bisect_left(pairs, (key, cid))
+            if i < len(pairs) and pairs[i] == (key, cid):
+                del pairs[i]
+
+    def add(self, crop):
+        with self.lock:
+            self._delete(crop["crop_name"])
+            self._insert(crop)
+            self.dirty = True
+
+    def update(self, old_name, crop):
+        with self.lock:
+            cid = self.ids.get(old_name)
+            if cid is not None and old_name == crop["crop_name"]:
+                self.entries[cid]["rate_per_unit"] = crop["rate_per_unit"]
+            else:
+                self._delete(old_name)
+                self._insert(crop)
+            self.dirty = True
+
+    def remove(self, name):
+        with self.lock:
+            self._delete(name)
+            self.dirty = True
+
+    def digest(self):
+        # Recomputed lazily: local edits only mark the index dirty
+        with self.lock:
+            if self.dirty:
+                self.version = board_version(build_items(self.entries.values()))
+                self.dirty = False
+            return self.version
+
+    # ----- queries -----
+    def _prefix_ids(self, token):
+        lo, hi = _prefix_range(self.words, token)
+        return {cid for _, cid in self.words[lo:hi]}
+
+    def _similar_words(self, token):
+        grams = trigrams(token)
+        # Jaccard >= t needs at least ceil(t * |grams|) shared trigrams, and any word
+        # sharing that many must hold one of the query's (|grams| - need + 1) rarest.
+        # One edit changes at most four of them (a transposition), so the five
+        # rarest also reach every word one edit away.
+        need = max(1, math.ceil(FUZZY_MIN_SIMILARITY * len(grams)))
+        rarest = sorted(grams, key=lambda gram: len(self.vocab_grams.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:max(len(grams) - need + 1, 5)]:
+            candidates.update(self.vocab_grams.get(gram, ()))
+        if len(token) <= SHORT_TOKEN:
+            # Too few trigrams to survive a typo ("dl" vs "dal"): also try words
+            # starting with either of the first two letters ("utr" vs "tur")
+            for letter in token[:2]:
+                candidates.update(self.vocab_grams.get("  " + letter, ()))
+        similar = {}
+        for word in candidates:
+            if word.startswith(token):
+                continue   # already a prefix hit
+            word_grams = trigrams(word)
+            common = len(grams & word_grams)
+            similarity = common / (len(grams) + len(word_grams) - common)
+            if _one_edit_apart(token, word):
+                # A swap in "soyabean" keeps only ~0.39 of the trigrams; score it as
+                # edit similarity instead (1 - distance / longer length)
+                similarity = max(similarity, 1 - 1 / max(len(token), len(word)))
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                similar[word] = similarity
+        return similar
+
+    def _fuzzy_hits(self, tokens, exclude):
+        # Per token: prefix hits score 1.0, names holding a similar word score
+        # that word's similarity. A name must match every token; its score is the mean.
+        per_token = []
+        for token in tokens:
+            scores = dict.fromkeys(self._prefix_ids(token), 1.0)
+            for word, similarity in self._similar_words(token).items():
+                lo, hi = _word_range(self.words, word)
+                for _, cid in self.words[lo:hi]:
+                    if scores.get(cid, 0) < similarity:
+                        scores[cid] = similarity
+            if not scores:
+                return {}
+            per_token.append(scores)
+        per_token.sort(key=len)
+        candidates = set(per_token[0]).difference(exclude)
+        for scores in per_token[1:]:
+            candidates.intersection_update(scores)
+        return {cid: sum(s[cid] for s in per_token) / len(per_token) for cid in candidates}
+
+    def search(self, query, limit=20):
+        norm = normalize(query)
+        if not norm:
+            return []
+        tokens = norm.split()
+        results = []
+
+        with self.lock:
+            lo, hi = _prefix_range(self.names, norm)
+            taken = {cid for _, cid in self.names[lo:hi]}
+            for cid in heapq.nsmallest(limit, taken, key=self.keys.__getitem__):
+                match = "exact" if self.keys[cid][1] == norm else "prefix"
+                results.append((cid, match, len(norm) / self.keys[cid][0]))
+
+            # Lower tiers only run while the better ones have not filled the page
+            if len(results) < limit:
+                word_ids = set.intersection(*(self._prefix_ids(t) for t in tokens)) - taken
+                for cid in heapq.nsmallest(limit - len(results), word_ids, key=self.keys.__getitem__):
+                    results.append((cid, "word", len(norm) / self.keys[cid][0]))
+                taken |= word_ids
+
+            if len(results) < limit:
+                fuzzy = self._fuzzy_hits(tokens, taken)
+                best = heapq.nsmallest(limit - len(results), fuzzy, key=lambda cid: (-fuzzy[cid], self.keys[cid]))
+                results.extend((cid, "fuzzy", fuzzy[cid]) for cid in best)
+
+            return [
+                dict(self.entries[cid], match=match, score=round(min(score, 1.0), 4))
+                for cid, match, score in results
+            ]
+
+
+class CropSearch:
+    def __init__(self, load_catalog, current_version, max_companies=500, revalidate_seconds=1.0, flights=None):
+        self.load_catalog = load_catalog          # company_id -> crop_details
+        self.current_version = current_version    # company_id -> price board head version (or None)
+        self.max_companies = max_companies
+        self.revalidate_seconds = revalidate_seconds
+        self.flights = flights or Group()         # one build per company at a time, shared by its searches
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.builds = 0
+        self.refreshes = 0
+
+    def _cached(self, company_id):
+        with self._lock:
+            index = self._indexes.get(company_id)
+            if index is not None:
+                self._indexes.move_to_end(company_id)
+            return index
+
+    def _build(self, company_id, head=None):
+        index = CropIndex(self.load_catalog(company_id))
+        index.built_for = head
+        with self._lock:
+            self._indexes[company_id] = index
+            self._indexes.move_to_end(company_id)
+            while len(self._indexes) > self.max_companies:
+                self._indexes.popitem(last=False)
+            self.builds += 1
+        return index
+
+    def _build_once(self, company_id, head=None):
+        # Concurrent callers wait on the leader's build; the index itself is read
+        # back from the cache, as single-flight would deep-copy it for followers
+        built = []
+        self.flights.do(("search", company_id), lambda: built.append(self._build(company_id, head)))
+        return built[0] if built else self._cached(company_id) or self._build(company_id)
+
+    def _refresh(self, company_id, head):
+        # The stale index keeps answering while its replacement is built off the request path
+        with self._lock:
+            if company_id in self._refreshing:
+                return
+            self._refreshing.add(company_id)
+            self.refreshes += 1
+
+        def run():
+            try:
+                self._build_once(company_id, head)
+            except Exception:
+                pass   # retried at the next revalidation
+            finally:
+                with self._lock:
+                    self._refreshing.discard(company_id)
+
+        threading.Thread(target=run, name="search-refresh", daemon=True).start()
+
+    def index(self, company_id):
+        index = self._cached(company_id)
+        if index is None:
+            return self._build_once(company_id)
+        if time.monotonic() - index.checked_at < self.revalidate_seconds:
+            return index
+        index.checked_at = time.monotonic()
+        try:
+            head = self.current_version(company_id)
+        except Exception:
+            return index   # keep answering from what we have while the database is away
+        # An index already rebuilt for this head that still differs means the head itself
+        # is behind (its publish failed); rebuilding again would only repeat the same digest
+        if head is not None and head != index.digest() and head != index.built_for:
+            self._refresh(company_id, head)
+        return index
+
+    def search(self, company_id, query, limit=20):
+        return self.index(company_id).search(query, limit)
+
+    # ----- incremental updates (no-ops for companies not indexed yet) -----
+    def crop_added(self, company_id, crop):
+        index = self._cached(company_id)
+        if index is not None:
+            index.add(crop)
+
+    def crop_updated(self, company_id, old_name, crop):
+        index = self._cached(company_id)
+        if index is not None:
+            index.update(old_name, crop)
+
+    def crop_removed(self, company_id, crop_name):
+        index = self._cached(company_id)
+        if index is not None:
+            index.remove(crop_name)
+
+    def invalidate(self, company_id):
+        with self._lock:
+            self._indexes.pop(company_id, None)
+
+
+def benchmark(n_crops=50000, n_queries=2000, seed=1):
+    rng = random.Random(seed)
+    bases = ["Soyabean", "Tur", "Wheat", "Bajra", "Jowar", "Chana", "Moong", "Urad", "Groundnut", "Cotton",
+             "Maize", "Mustard", "Sesame", "Castor", "Cumin", "Coriander", "Paddy", "Masoor", "Rajma", "Sugarcane"]
+    qualifiers = ["yellow", "black", "white", "FAQ", "bold", "medium", "organic", "lokwan", "sharbati", "desi"]
+    details = []
+    seen = set()
+    while len(details) < n_crops:
+        name = f"{rng.choice(bases)} ({rng.choice(qualifiers)}, {rng.choice(qualifiers)}) {rng.randrange(1000)}"
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            details.append({"crop_name": name, "rate_per_unit": rng.uniform(10, 9000)})
+
+    def typo(word):
+        i = rng.randrange(len(word) - 1)
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+    queries = []
+    typos = []   # (query, base) pairs whose results must include that base
+    for _ in range(n_queries):
+        base = rng.choice(bases)
+        query = rng.choice([base[:3], base, typo(base), f"{base} {rng.choice(qualifiers)[:2]}"])
+        queries.append(query)
+        if query.lower() not in base.lower():
+            typos.append((query, base.lower()))
+
+    t0 = time.perf_counter()
+    index = CropIndex(details)
+    t1 = time.perf_counter()
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, 20)
+        timings.append(time.perf_counter() - start)
+    t2 = time.perf_counter()
+    found = sum(any(item["crop_name"].lower().startswith(base) for item in index.search(q, 20)) for q, base in typos)
+    for crop in details[:1000]:
+        index.update(crop["crop_name"], dict(crop, crop_name=crop["crop_name"] + " new"))
+    t3 = time.perf_counter()
+    timings.sort()
+    return {
+        "crops": n_crops,
+        "queries": n_queries,
+        "build_ms": round((t1 - t0) * 1000, 3),
+        "query_p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "query_p99_ms": round(timings[int(len(timings) * 0.99)] * 1000, 3),
+        "queries_per_sec": round(n_queries / (t2 - t1)),
+        "typo_recall": round(found / len(typos), 4) if typos else None,
+        "rename_us": round((t3 - t2) / 1000 * 1e6, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crop name search index")
+    parser.add_argument("--crops", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for key, value in benchmark(args.crops, args.queries, args.seed).items():
+        print(f"{key:>16}: {value}")
@@ -0,0 +1,239 @@
+import argparse
+import os
+import random
+import re
+import struct
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+import bcrypt
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from pymongo.write_concern import WriteConcern
+
+
+# ---------- Synthetic tenant generator ----------
+# Produces companies (with embedded employees) and crop catalogs in exactly the
+# shapes create_company_admin / create_officer / add_crop write. Every company
+# is generated from its own Random("<seed>:<index>"), so output is identical
+# for a given seed no matter how the work is split across processes.
+BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+BASE_TIME = datetime(2025, 1, 1)
+
+COMMODITIES = [
+    "Wheat", "Paddy", "Rice", "Maize", "Bajra", "Jowar", "Ragi", "Barley",
+    "Soyabean", "Groundnut", "Mustard", "Sesame", "Sunflower", "Castor Seed",
+    "Cotton", "Tur", "Moong", "Urad", "Chana", "Masoor", "Rajma", "Moth",
+    "Cumin", "Coriander", "Fennel", "Fenugreek", "Turmeric", "Dry Chilli",
+    "Onion", "Potato", "Garlic", "Ginger", "Jaggery", "Sugarcane", "Guar Seed",
+    "Isabgol", "Ajwain", "Kalonji", "Niger Seed", "Linseed",
+]
+VARIETIES = [
+    "", "Lokwan", "Sharbati", "Desi", "Hybrid", "Yellow", "Black", "Red",
+    "Bold", "Medium", "Small", "Organic",
+]
+GRADES = ["", "FAQ", "Grade A", "Grade B", "Grade C", "Sortex"]
+
+# Every unique (commodity, variety, grade) name, e.g. "Soyabean (Yellow, FAQ)"
+CROP_NAMES = []
+for _c in COMMODITIES:
+    for _v in VARIETIES:
+        for _g in GRADES:
+            _q = ", ".join(p for p in (_v, _g) if p)
+            CROP_NAMES.append(f"{_c} ({_q})" if _q else _c)
+
+
+def deterministic_salt(rng, rounds):
+    # bcrypt only uses 4 bits of the final salt character, so pick it from the
+    # characters that encode those bits cleanly.
+    body = "".join(rng.choice(BCRYPT_ALPHABET) for _ in range(21)) + rng.choice(".Oeu")
+    return f"$2b${rounds:02d}${body}".encode("ascii")
+
+
+def deterministic_object_id(rng, when):
+    return ObjectId(struct.pack(">I", int(when.timestamp())) + rng.randbytes(8))
+
+
+def skewed_count(rng, minimum, maximum, alpha):
+    # Pareto: most tenants are small, a long tail reaches the maximum.
+    return min(maximum, max(minimum, int(minimum * rng.paretovariate(alpha))))
+
+
+class PasswordPool:
+    def __init__(self, seed, size, rounds):
+        self.passwords = [f"seed-pass-{k}" for k in range(size)]
+        self.hashes = []
+        for k, plain in enumerate(self.passwords):
+            rng = random.Random(f"{seed}:salt:{k}")
+            self.hashes.append(bcrypt.hashpw(plain.encode("utf-8"), deterministic_salt(rng, rounds)))
+
+
+def generate_company(index, opts, pool):
+    rng = random.Random(f"{opts.seed}:{index}")
+    company_id = f"{opts.prefix}{index:06d}"
+    created = BASE_TIME + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+    headcount = skewed_count(rng, opts.min_employees, opts.max_employees, opts.headcount_alpha)
+    admins = min(headcount, 1 + (headcount > 50) + (headcount > 1000))
+    employees = []
+    for n in range(headcount):
+        is_admin = n < admins
+        username = ("admin" if n == 0 else f"admin{n + 1}") if is_admin else f"officer{n - admins + 1:05d}"
+        employees.append({
+            "_id": str(deterministic_object_id(rng, created)),
+            "username": username,
+            "password_hash": pool.hashes[rng.randrange(len(pool.hashes))],
+            "role": "Admin" if is_admin else "Officer",
+        })
+
+    n_crops = skewed_count(rng, opts.min_crops, min(opts.max_crops, len(CROP_NAMES)), opts.crops_alpha)
+    admin_names = [e["username"] for e in employees[:admins]] or ["admin"]
+    crop_details = []
+    for crop_name in rng.sample(CROP_NAMES, n_crops):
+        created_at = created + timedelta(seconds=rng.randrange(180 * 24 * 3600))
+        updated_at = created_at + timedelta(seconds=rng.randrange(90 * 24 * 3600))
+        crop_details.append({
+            "crop_name": crop_name,
+            "rate_per_unit": round(rng.uniform(8, 12000), 2),
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "created_by": rng.choice(admin_names),
+            "updated_by": rng.choice(admin_names),
+        })
+
+    return (
+        {"company_id": company_id, "employees": employees},
+        {"company_id": company_id, "crop_details": crop_details},
+    )
+
+
+# Per-process state for pool workers
+_worker = {}
+
+
+def _init_worker(opts):
+    client = MongoClient(opts.database_url) if not opts.dry_run else None
+    wc = WriteConcern(w=0) if opts.unacknowledged else WriteConcern(w=1)
+    db = client[opts.db_name] if client else None
+    _worker.update(
+        opts=opts,
+        pool=PasswordPool(opts.seed, opts.password_pool, opts.bcrypt_rounds),
+        companies=db.get_collection("companies", write_concern=wc) if db is not None else None,
+        crops=db.get_collection("crops", write_concern=wc) if db is not None else None,
+    )
+
+
+def _insert_missing(collection, docs):
+    # Nothing in the schema makes company_id unique, so a re-run (or a run resumed
+    # after a crash between the two collections) skips tenants already written
+    existing = {d["company_id"] for d in collection.find(
+        {"company_id": {"$in": [d["company_id"] for d in docs]}}, {"company_id": 1, "_id": 0})}
+    missing = [d for d in docs if d["company_id"] not in existing]
+    if missing:
+        collection.insert_many(missing, ordered=False, bypass_document_validation=True)
+    return existing
+
+
+def _load_range(bounds):
+    start, stop = bounds
+    opts = _worker["opts"]
+    pool = _worker["pool"]
+    company_batch, crop_batch, batch_bytes = [], [], 0
+    totals = {"companies": 0, "employees": 0, "crops": 0, "skipped": 0}
+
+    def flush():
+        nonlocal company_batch, crop_batch, batch_bytes
+        skipped = set()
+        if company_batch and not opts.dry_run:
+            skipped = _insert_missing(_worker["companies"], company_batch)
+            _insert_missing(_worker["crops"], crop_batch)
+        for comp, crop_doc in zip(company_batch, crop_batch):
+            if comp["company_id"] in skipped:
+                totals["skipped"] += 1
+                continue
+            totals["companies"] += 1
+            totals["employees"] += len(comp["employees"])
+            totals["crops"] += len(crop_doc["crop_details"])
+        company_batch, crop_batch, batch_bytes = [], [], 0
+
+    for index in range(start, stop):
+        comp, crop_doc = generate_company(index, opts, pool)
+        company_batch.append(comp)
+        crop_batch.append(crop_doc)
+        # Rough BSON size estimate keeps each insert_many well under the 48MB message limit
+        batch_bytes += 110 * len(comp["employees"]) + 150 * len(crop_doc["crop_details"])
+        if batch_bytes >= opts.batch_bytes:
+            flush()
+    flush()
+    return totals
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Seed FarmDesk with synthetic tenants for scale testing")
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="seed-", help="company_id prefix for generated tenants")
+    parser.add_argument("--min-employees", type=int, default=2)
+    parser.add_argument("--max-employees", type=int, default=20000)
+    parser.add_argument("--headcount-alpha", type=float, default=1.1, help="Pareto shape; lower = heavier tail")
+    parser.add_argument("--min-crops", type=int, default=5)
+    parser.add_argument("--max-crops", type=int, default=2000)
+    parser.add_argument("--crops-alpha", type=float, default=1.3)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--password-pool", type=int, default=8, help="distinct passwords (each hashed once per process)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=50, help="companies per work unit")
+    parser.add_argument("--batch-bytes", type=int, default=8 * 1024 * 1024)
+    parser.add_argument("--unacknowledged", action="store_true", help="insert with w=0 for maximum throughput")
+    parser.add_argument("--drop", action="store_true", help="delete previously seeded tenants with the same prefix first")
+    parser.add_argument("--dry-run", action="store_true", help="generate without writing to MongoDB")
+    parser.add_argument("--db-name", default="FarmDesk")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    opts = parser.parse_args(argv)
+
+    if not 4 <= opts.bcrypt_rounds <= 31:
+        parser.error("--bcrypt-rounds must be between 4 and 31")
+    if len(CROP_NAMES) < opts.max_crops:
+        print(f"note: only {len(CROP_NAMES)} distinct crop names available; capping catalogs there")
+
+    if opts.drop and not opts.prefix:
+        parser.error("--drop needs a non-empty --prefix; an empty one would delete every tenant")
+
+    if not opts.dry_run:
+        db = MongoClient(opts.database_url)[opts.db_name]
+        # Lets each batch check for already seeded tenants without a collection scan
+        db.companies.create_index("company_id")
+        db.crops.create_index("company_id")
+    if opts.drop and not opts.dry_run:
+        prefix = {"company_id": {"$regex": "^" + re.escape(opts.prefix)}}
+        print(f"dropped {db.companies.delete_many(prefix).deleted_count} companies, "
+              f"{db.crops.delete_many(prefix).deleted_count} crop docs")
+
+    ranges = [(i, min(i + opts.chunk, opts.companies)) for i in range(0, opts.companies, opts.chunk)]
+    totals = {"companies": 0, "employees": 0, "crops": 0, "skipped": 0}
+    started = time.perf_counter()
+    if opts.workers > 1:
+        with Pool(opts.workers, initializer=_init_worker, initargs=(opts,)) as pool:
+            for part in pool.imap_unordered(_load_range, ranges):
+                for key in totals:
+                    totals[key] += part[key]
+    else:
+        _init_worker(opts)
+        for bounds in ranges:
+            part = _load_range(bounds)
+            for key in totals:
+                totals[key] += part[key]
+    elapsed = time.perf_counter() - started
+
+    docs = totals["companies"] * 2
+    print(f"companies={totals['companies']} employees={totals['employees']} crops={totals['crops']} "
+          f"skipped={totals['skipped']} (already seeded)")
+    print(f"elapsed={elapsed:.2f}s docs/s={docs / elapsed:.0f} employees/s={totals['employees'] / elapsed:.0f}")
+    print(f"passwords: seed-pass-0 .. seed-pass-{opts.password_pool - 1} (bcrypt cost {opts.bcrypt_rounds})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import argparse
+import fcntl
+import json
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import Pool
+
+
+# ---------- Host-wide shared cache ----------
+# One memory-mapped segment per host (put it on /dev/shm) that every worker
+# process maps, so a crop catalog is loaded from Mongo once per box instead of
+# once per worker, and costs page cache once instead of heap N times.
+#
+# The segment is an append-only log: [header][record][record]...
+#   header: magic, flags, generation, write offset, capacity
+#   record: length, key length, stored_at, tombstone flag, key, JSON value
+# Writers serialize on flock() of a side lock file, append the record, then
+# publish it by bumping the header's write offset, so readers never see a
+# half-written record. Readers take no lock: each keeps a private index
+# (key -> offset) and only parses the records appended since its last look.
+#
+# When the log is full the writer compacts: the newest live records that fit
+# in the eviction budget are copied into a new file, which replaces the old one
+# with os.replace(); the old header is then flagged retired so readers remap.
+# Eviction is by write recency, since readers do not write to the segment.
+MAGIC = b"FDC1"
+HEADER = struct.Struct("<4sIQQQ")   # magic, flags, generation, write offset, capacity
+HEADER_SIZE = 64
+OFFSET_POS = 16                     # byte position of the write offset in HEADER
+RECORD = struct.Struct("<IIdB")     # record length, key length, stored_at, tombstone
+RETIRED = 1
+
+
+def _encode(value):
+    def default(obj):
+        if isinstance(obj, datetime):
+            return {"$dt": obj.isoformat()}
+        raise TypeError(f"Cannot cache {type(obj).__name__}")
+    return json.dumps(value, default=default, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_hook(obj):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _decode(raw):
+    return json.loads(raw, object_hook=_decode_hook)
+
+
+class SharedCache:
+    def __init__(self, path, capacity=64 << 20, ttl=5.0, compact_target=0.5):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl                        # seconds; bounds staleness from writers on other hosts
+        self.compact_target = compact_target  # fraction of the segment kept by a compaction
+        self._lock = threading.RLock()
+        self._pid = None
+        self._lock_fd = None
+        self._file = None
+        self._map = None
+        self.hits = self.misses = self.expired = 0
+        self.writes = self.compactions = self.evicted = self.oversize = 0
+        with self._lock:
+            self._attach()
+
+    # ----- segment lifecycle -----
+    def _attach(self):
+        # Also runs after fork(): flock() belongs to the open file, so every process needs its own
+        self._pid = os.getpid()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+        self._lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        if not os.path.exists(self.path):
+            with self._exclusive():
+                if not os.path.exists(self.path):
+                    self._write_segment(1, [])
+        self._remap()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, _, self.generation, _, capacity = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a cache segment")
+        self.capacity = capacity
+        self._index = {}                  # key -> (value offset, value length, stored_at, record size)
+        self._scanned = HEADER_SIZE
+
+    def _write_segment(self, generation, records):
+        # Builds a complete segment next to the live one and swaps it in atomically
+        body = b"".join(records)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.truncate(self.capacity)
+            f.write(HEADER.pack(MAGIC, 0, generation, HEADER_SIZE + len(body), self.capacity))
+            f.seek(HEADER_SIZE)
+            f.write(body)
+        os.replace(tmp, self.path)
+
+    @contextmanager
+    def _exclusive(self):
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _sync(self):
+        # Caller holds self._lock
+        if os.getpid() != self._pid:
+            self._attach()
+        flags, = struct.unpack_from("<I", self._map, 4)
+        if flags & RETIRED:
+            self._remap()
+        end, = struct.unpack_from("<Q", self._map, OFFSET_POS)
+        pos = self._scanned
+        index = self._index
+        while pos < end:
+            size, key_len, stored_at, tombstone = RECORD.unpack_from(self._map, pos)
+            start = pos + RECORD.size
+            key = self._map[start:start + key_len].decode("utf-8")
+            if tombstone:
+                index.pop(key, None)
+            else:
+                index[key] = (start + key_len, size - RECORD.size - key_len, stored_at, size)
+            pos += size
+        self._scanned = pos
+
+    # ----- reads -----
+    def get(self, key):
+        with self._lock:
+            self._sync()
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            offset, length, stored_at, _ = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                self.expired += 1
+                return None
+            raw = self._map[offset:offset + length]
+            self.hits += 1
+        return _decode(raw)
+
+    # ----- writes -----
+    def put(self, key, value):
+        return self._append(key, _encode(value), tombstone=False)
+
+    def delete(self, key):
+        return self._append(key, b"", tombstone=True)
+
+    def _record(self, key, data, stored_at, tombstone):
+        key = key.encode("utf-8")
+        return RECORD.pack(RECORD.size + len(key) + len(data), len(key), stored_at, tombstone) + key + data
+
+    def _append(self, key, data, tombstone):
+        record = self._record(key, data, time.time(), tombstone)
+        if len(record) > (self.capacity - HEADER_SIZE) * self.compact_target:
+            self.oversize += 1
+            if not tombstone:
+                self.delete(key)   # never leave an older copy behind
+            return False
+        with self._lock:
+            with self._exclusive():
+                self._sync()
+                if tombstone and key not in self._index:
+                    return True
+                end, = struct.unpack_from("<Q", self._map, OFFSET_POS)
+                if end + len(record) > self.capacity:
+                    self._compact(key, record, tombstone)
+                else:
+                    self._map[end:end + len(record)] = record
+                    struct.pack_into("<Q", self._map, OFFSET_POS, end + len(record))
+                self.writes += 1
+                self._sync()
+        return True
+
+    def _compact(self, pending_key, pending, tombstone):
+        # Caller holds the flock and has synced: self._index is the live set
+        budget = (self.capacity - HEADER_SIZE) * self.compact_target - len(pending)
+        now = time.time()
+        keep = []
+        used = 0
+        for key, (offset, length, stored_at, size) in sorted(self._index.items(), key=lambda kv: -kv[1][0]):
+            if key == pending_key:
+                continue
+            if (self.ttl and now - stored_at > self.ttl) or used + size > budget:
+                self.evicted += 1
+                continue
+            keep.append(self._record(key, self._map[offset:offset + length], stored_at, False))
+            used += size
+        keep.reverse()
+        if not tombstone:   # a tombstone has nothing left to delete in the new segment
+            keep.append(pending)
+        self._write_segment(self.generation + 1, keep)
+        struct.pack_into("<I", self._map, 4, RETIRED)
+        self._remap()
+        self.compactions += 1
+
+    def stats(self):
+        with self._lock:
+            self._sync()
+            used, = struct.unpack_from("<Q", self._map, OFFSET_POS)
+            return {
+                "generation": self.generation,
+                "entries": len(self._index),
+                "bytes_used": used,
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "writes": self.writes,
+                "compactions": self.compactions,
+                "evicted": self.evicted,
+                "oversize": self.oversize,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._file.close()
+                self._map = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+
+# ---------- Benchmark: shared segment vs per-process caches ----------
+class _LocalCache:
+    # What each worker would otherwise do: an LRU of decoded values, bounded by encoded size
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.used = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value):
+        size = len(_encode(value))
+        self._items[key] = (value, size)
+        self.used += size
+        while self.used > self.capacity:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.used -= evicted
+
+
+def _catalog(key, size):
+    rng = random.Random(key)
+    now = datetime(2026, 1, 1)
+    return [{"crop_name": f"Crop {key} {i}", "rate_per_unit": round(rng.uniform(10, 9000), 2),
+             "created_at": now, "updated_at": now, "created_by": "admin", "updated_by": "admin"}
+            for i in range(size)]
+
+
+def _bench_worker(args):
+    mode, path, capacity, n_gets, n_keys, catalog_size, seed = args
+    cache = SharedCache(path, capacity, ttl=0) if mode == "shared" else _LocalCache(capacity)
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(n_keys)]     # Zipf-like company popularity
+    keys = rng.choices(range(n_keys), weights, k=n_gets)
+    tracemalloc.start()
+    loads = 0
+    start = time.perf_counter()
+    for k in keys:
+        key = f"crops:{k}"
+        value = cache.get(key)
+        if value is None:
+            loads += 1
+            value = _catalog(k, catalog_size)
+            cache.put(key, value)
+        value = None
+    elapsed = time.perf_counter() - start
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"loads": loads, "gets": n_gets, "heap": heap, "seconds": elapsed}
+
+
+def benchmark(workers=8, n_gets=2000, n_keys=200, catalog_size=200, capacity=32 << 20, seed=1):
+    results = {}
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+        path = os.path.join(tmp, "bench.cache")
+        for mode in ("local", "shared"):
+            jobs = [(mode, path, capacity, n_gets, n_keys, catalog_size, seed + w) for w in range(workers)]
+            with Pool(workers) as pool:
+                runs = pool.map(_bench_worker, jobs)
+            gets = sum(r["gets"] for r in runs)
+            loads = sum(r["loads"] for r in runs)
+            results[mode] = {
+                "db_loads": loads,
+                "hit_rate": round(1 - loads / gets, 4),
+                "heap_mb_total": round(sum(r["heap"] for r in runs) / 2 ** 20, 2),
+                "gets_per_sec": round(gets / max(r["seconds"] for r in runs)),
+            }
+        stats = SharedCache(path, capacity).stats()
+        results["shared"]["segment_mb"] = round(stats["bytes_used"] / 2 ** 20, 2)
+        results["shared"]["compactions"] = stats["compactions"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the host-wide shared cache against per-process caches")
+    parser.add_argument("--bench", action="store_true", help="run the benchmark")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--gets", type=int, default=2000, help="lookups per worker")
+    parser.add_argument("--keys", type=int, default=200, help="distinct company catalogs")
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--capacity-mb", type=int, default=32)
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+    else:
+        report = benchmark(args.workers, args.gets, args.keys, args.catalog_size, args.capacity_mb << 20)
+        for mode, row in report.items():
+            print(mode)
+            for key, value in row.items():
+                print(f"  {key:>14}: {value}")
@@ -0,0 +1,66 @@
+import copy
+import threading
+
+
+# ---------- Single-flight ----------
+# Concurrent callers asking for the same key share one in-flight call: the
+# first caller runs it, the rest wait for its result (or exception). Followers
+# receive deep copies so no two requests ever share a mutable document.
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class Group:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0        # total do() invocations
+        self.executed = 0     # calls that actually ran fn
+        self.collapsed = 0    # calls answered by someone else's in-flight fn
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                shared = call.followers > 0
+            call.done.set()
+        # Once the key is gone nobody else can join, so an unshared result can be returned as-is
+        return copy.deepcopy(call.result) if shared else call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,32 @@
+from .base import (
+    Store, StorageError, CompanyNotFound, UsernameTaken, CatalogNotFound, CropNotFound, CropExists,
+    RateConflict, is_officer,
+)
+from .cached import CachedStore
+from .memory import MemoryStore
+from .mongo import MongoStore
+from .sqlite import SQLiteStore
+
+
+# ---------- Backend selection ----------
+# STORAGE_BACKEND=mongo (default) | memory | sqlite:///path/to/farmdesk.db
+def create_store(backend, db=None, call=None, flights=None):
+    backend = (backend or "mongo").strip()
+    if backend == "mongo":
+        if db is None:
+            raise ValueError("The mongo storage backend needs a database")
+        return MongoStore(db, call=call, flights=flights)
+    if backend == "memory":
+        return MemoryStore()
+    if backend.startswith("sqlite://"):
+        path = backend[len("sqlite://"):]
+        if path.startswith("/") and not path.startswith("//"):
+            path = path[1:]   # sqlite:///farmdesk.db -> relative, sqlite:////var/db/x.db -> absolute
+        return SQLiteStore(path or ":memory:")
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+__all__ = [
+    "Store", "StorageError", "CompanyNotFound", "UsernameTaken", "CatalogNotFound", "CropNotFound",
+    "CropExists", "RateConflict", "is_officer", "CachedStore", "MemoryStore", "MongoStore", "SQLiteStore", "create_store",
+]
@@ -0,0 +1,146 @@
+import copy
+
+
+# ---------- Storage interface ----------
+# Everything the route handlers need from the database. Employees are returned
+# in the embedded shape {"_id", "username", "password_hash", "role"} and crops in
+# the crop_details shape, whichever backend holds them.
+ADMIN_ROLES = {"company_admin", "admin", "superadmin"}
+
+
+def is_officer(role):
+    # Mirrors normalize_role(): empty and admin-like roles are admins, everything else is an officer
+    return bool(role) and str(role).lower() not in ADMIN_ROLES
+
+
+class StorageError(Exception):
+    pass
+
+
+class CompanyNotFound(StorageError):
+    pass
+
+
+class UsernameTaken(StorageError):
+    pass
+
+
+class CatalogNotFound(StorageError):
+    pass
+
+
+class CropNotFound(StorageError):
+    pass
+
+
+class CropExists(StorageError):
+    pass
+
+
+class RateConflict(StorageError):
+    pass
+
+
+class Store:
+    name = "abstract"
+
+    # ----- employees -----
+    # Return (company_exists, employee_or_None) including password_hash.
+    def find_employee(self, company_id, username):
+        raise NotImplementedError
+
+    # Employee by id (or username as a fallback), without password_hash.
+    def get_employee(self, company_id, emp_id, username=None):
+        raise NotImplementedError
+
+    # Append emp; raises UsernameTaken, or CompanyNotFound unless create_company.
+    def add_employee(self, company_id, emp, create_company=False):
+        raise NotImplementedError
+
+    # Remove an officer; returns False if no such officer, raises CompanyNotFound.
+    def delete_officer(self, company_id, officer_id):
+        raise NotImplementedError
+
+    # Iterable of officers ordered by username as {"_id", "username", "role"}, starting after `after`.
+    def list_officers(self, company_id, prefix="", after=None, limit=None):
+        raise NotImplementedError
+
+    # ----- crops -----
+    # The company's crop_details list; creates an empty catalog when create is set.
+    def get_crops(self, company_id, create=True):
+        raise NotImplementedError
+
+    # Append crop; raises CropExists on a case-insensitive name clash.
+    def add_crop(self, company_id, crop):
+        raise NotImplementedError
+
+    # Append several crops in one write, creating the catalog if needed; raises
+    # CropExists (nothing written) if any name clashes case-insensitively.
+    def add_crops(self, company_id, crops):
+        raise NotImplementedError
+
+    # Apply changes to the crop named exactly crop_name; returns (before, after).
+    def update_crop(self, company_id, crop_name, changes):
+        raise NotImplementedError
+
+    # Remove the crop named exactly crop_name; raises CatalogNotFound / CropNotFound.
+    def delete_crop(self, company_id, crop_name):
+        raise NotImplementedError
+
+    # One atomic write for many crops. rates maps exact crop_name -> (expected, new);
+    # raises RateConflict (nothing written) if a crop is gone or its rate is no longer
+    # `expected` (None skips that check), CatalogNotFound if there is no catalog.
+    def set_rates(self, company_id, rates, updated_at, updated_by):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def public_employee(emp):
+    emp = dict(emp)
+    emp.pop("password_hash", None)
+    return emp
+
+
+def officer_view(emp):
+    return {"_id": str(emp.get("_id")), "username": emp.get("username"), "role": emp.get("role")}
+
+
+def apply_rates(crop_details, rates, updated_at, updated_by):
+    # Shared by the in-memory backends: returns the new list or raises RateConflict
+    pending = dict(rates)
+    updated = []
+    for crop in crop_details:
+        change = pending.pop(crop["crop_name"], None)
+        if change is not None:
+            expected, rate = change
+            if expected is not None and crop["rate_per_unit"] != expected:
+                raise RateConflict(crop["crop_name"])
+            crop = dict(crop, rate_per_unit=rate, updated_at=updated_at, updated_by=updated_by)
+        updated.append(crop)
+    if pending:
+        raise RateConflict(next(iter(pending)))
+    return updated
+
+
+def apply_crop_update(crop_details, crop_name, changes):
+    # Shared validation for backends that hold the whole catalog in memory
+    index = None
+    for i, crop in enumerate(crop_details):
+        if crop["crop_name"] == crop_name:
+            index = i
+            break
+    if index is None:
+        raise CropNotFound(crop_name)
+
+    new_name = changes.get("crop_name", crop_name)
+    for i, crop in enumerate(crop_details):
+        if i != index and crop["crop_name"].lower() == new_name.lower():
+            raise CropExists(new_name)
+
+    before = crop_details[index]
+    after = dict(before, **changes)
+    updated = list(crop_details)
+    updated[index] = after
+    return updated, copy.deepcopy(before), copy.deepcopy(after)
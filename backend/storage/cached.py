@@ -0,0 +1,84 @@
+from .base import Store
+
+
+# ---------- Read-through cache over any backend ----------
+# Crop catalogs and principal records (no password hashes) are served from a
+# host-wide shared cache (see shmcache.py); every write that goes through this
+# store drops the affected key for all processes on the host. Writes made on
+# other hosts or by the job worker show up once the cached copy's TTL lapses,
+# as does the rare read that loads an old copy just before a write drops it.
+class CachedStore(Store):
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+
+    @staticmethod
+    def _crops_key(company_id):
+        return f"crops:{company_id}"
+
+    @staticmethod
+    def _principal_key(company_id, emp_id):
+        return f"principal:{company_id}:{emp_id}"
+
+    # ----- employees -----
+    def find_employee(self, company_id, username):
+        # Login path: needs the password hash, which never goes into the shared segment
+        return self.inner.find_employee(company_id, username)
+
+    def get_employee(self, company_id, emp_id, username=None):
+        key = self._principal_key(company_id, emp_id)
+        emp = self.cache.get(key)
+        if emp is not None:
+            return emp
+        emp = self.inner.get_employee(company_id, emp_id, username)
+        if emp is not None and str(emp.get("_id")) == str(emp_id):
+            self.cache.put(key, {"_id": str(emp["_id"]), "username": emp.get("username"), "role": emp.get("role")})
+        return emp
+
+    def add_employee(self, company_id, emp, create_company=False):
+        return self.inner.add_employee(company_id, emp, create_company)
+
+    def delete_officer(self, company_id, officer_id):
+        try:
+            return self.inner.delete_officer(company_id, officer_id)
+        finally:
+            self.cache.delete(self._principal_key(company_id, officer_id))
+
+    def list_officers(self, company_id, prefix="", after=None, limit=None):
+        return self.inner.list_officers(company_id, prefix, after, limit)
+
+    # ----- crops -----
+    def get_crops(self, company_id, create=True):
+        key = self._crops_key(company_id)
+        crops = self.cache.get(key)
+        if crops is not None:
+            return crops
+        crops = self.inner.get_crops(company_id, create)
+        self.cache.put(key, list(crops))
+        return crops
+
+    def _invalidating(self, company_id, fn, *args):
+        try:
+            return fn(company_id, *args)
+        finally:
+            self.cache.delete(self._crops_key(company_id))
+
+    def add_crop(self, company_id, crop):
+        return self._invalidating(company_id, self.inner.add_crop, crop)
+
+    def add_crops(self, company_id, crops):
+        return self._invalidating(company_id, self.inner.add_crops, crops)
+
+    def update_crop(self, company_id, crop_name, changes):
+        return self._invalidating(company_id, self.inner.update_crop, crop_name, changes)
+
+    def delete_crop(self, company_id, crop_name):
+        return self._invalidating(company_id, self.inner.delete_crop, crop_name)
+
+    def set_rates(self, company_id, rates, updated_at, updated_by):
+        return self._invalidating(company_id, self.inner.set_rates, rates, updated_at, updated_by)
+
+    def close(self):
+        self.cache.close()
+        self.inner.close()
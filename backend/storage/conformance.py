@@ -0,0 +1,254 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+
+from shmcache import SharedCache
+
+from . import (
+    CatalogNotFound, CompanyNotFound, CropExists, CropNotFound, RateConflict, UsernameTaken,
+    CachedStore, MemoryStore, SQLiteStore, create_store,
+)
+
+
+# ---------- Conformance suite ----------
+# Every backend must behave the way the route handlers expect, so the same
+# checks run against each one:
+#   python -m storage.conformance                 # memory, sqlite, cached memory
+#   python -m storage.conformance --mongo URL     # ... and a scratch Mongo database
+CHECKS = []
+
+
+def check(fn):
+    CHECKS.append(fn)
+    return fn
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def expect_raises(exc, fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except exc:
+        return
+    raise AssertionError(f"expected {exc.__name__}")
+
+
+def _emp(username, role="Officer"):
+    return {"_id": uuid.uuid4().hex[:24], "username": username, "password_hash": b"$2b$hash", "role": role}
+
+
+def _crop(name, rate=10.0, actor="admin"):
+    now = datetime.utcnow().replace(microsecond=0)
+    return {"crop_name": name, "rate_per_unit": rate, "created_at": now,
+            "updated_at": now, "created_by": actor, "updated_by": actor}
+
+
+@check
+def company_lifecycle(store):
+    expect(store.find_employee("c1", "boss") == (False, None), "unknown company")
+    expect_raises(CompanyNotFound, store.add_employee, "c1", _emp("boss", "Admin"))
+    admin = _emp("boss", "Admin")
+    store.add_employee("c1", admin, create_company=True)
+    exists, emp = store.find_employee("c1", "boss")
+    expect(exists and emp["_id"] == admin["_id"], "admin stored")
+    expect(emp["password_hash"] == b"$2b$hash", "password hash round-trips as bytes")
+    expect(store.find_employee("c1", "nobody") == (True, None), "company exists, user does not")
+    expect_raises(UsernameTaken, store.add_employee, "c1", _emp("boss"))
+    expect_raises(UsernameTaken, store.add_employee, "c1", _emp("boss"), create_company=True)
+
+
+@check
+def employee_lookup(store):
+    admin = _emp("boss", "Admin")
+    store.add_employee("c1", admin, create_company=True)
+    emp = store.get_employee("c1", admin["_id"])
+    expect(emp and emp["username"] == "boss" and emp["role"] == "Admin", "lookup by id")
+    expect("password_hash" not in emp, "principal lookups never carry the hash")
+    expect(store.get_employee("c1", "missing", username="boss")["_id"] == admin["_id"], "username fallback")
+    expect(store.get_employee("c1", "missing") is None, "unknown id")
+    expect(store.get_employee("c2", admin["_id"]) is None, "other company")
+
+
+@check
+def officers(store):
+    store.add_employee("c1", _emp("boss", "Admin"), create_company=True)
+    store.add_employee("c1", _emp("root", "superadmin"))
+    ids = {}
+    for name in ("mira", "arjun", "meena", "zoya"):
+        ids[name] = _emp(name)
+        store.add_employee("c1", ids[name])
+    store.add_employee("c2", _emp("other"), create_company=True)
+
+    roster = list(store.list_officers("c1"))
+    names = [o["username"] for o in roster]
+    expect(names == ["arjun", "meena", "mira", "zoya"], f"ordered officers only, got {names}")
+    expect(set(roster[0]) == {"_id", "username", "role"}, "officer view shape")
+    expect([o["username"] for o in store.list_officers("c1", prefix="m")] == ["meena", "mira"], "prefix")
+    expect([o["username"] for o in store.list_officers("c1", after="meena", limit=1)] == ["mira"], "cursor + limit")
+    expect(list(store.list_officers("nope")) == [], "unknown company has no officers")
+
+    expect(store.delete_officer("c1", ids["mira"]["_id"]) is True, "officer deleted")
+    expect(store.delete_officer("c1", ids["mira"]["_id"]) is False, "already gone")
+    admin_id = store.find_employee("c1", "boss")[1]["_id"]
+    expect(store.delete_officer("c1", admin_id) is False, "admins are not officers")
+    expect(store.find_employee("c1", "boss")[1] is not None, "admin survives")
+    expect_raises(CompanyNotFound, store.delete_officer, "nope", "x")
+    expect([o["username"] for o in store.list_officers("c1")] == ["arjun", "meena", "zoya"], "roster after delete")
+
+
+@check
+def crop_catalog(store):
+    expect(store.get_crops("c1") == [], "empty catalog is created")
+    expect_raises(CatalogNotFound, store.update_crop, "c9", "Wheat", {"rate_per_unit": 1.0})
+    expect_raises(CatalogNotFound, store.delete_crop, "c9", "Wheat")
+    expect(store.get_crops("c9", create=False) == [], "no catalog without create")
+
+    store.add_crop("c1", _crop("Wheat", 20.5))
+    store.add_crop("c1", _crop("Tur Dal", 90.0))
+    store.add_crop("c2", _crop("Wheat", 1.0))
+    expect_raises(CropExists, store.add_crop, "c1", _crop("wheat"))
+
+    crops = store.get_crops("c1")
+    expect([c["crop_name"] for c in crops] == ["Wheat", "Tur Dal"], "insertion order kept")
+    expect(isinstance(crops[0]["created_at"], datetime), "datetimes round-trip")
+    expect(crops[0]["rate_per_unit"] == 20.5, "rate stored")
+
+    crops[0]["rate_per_unit"] = 0
+    expect(store.get_crops("c1")[0]["rate_per_unit"] == 20.5, "callers cannot mutate stored state")
+
+
+@check
+def bulk_add(store):
+    store.add_crops("c1", [_crop("Wheat"), _crop("Bajra")])
+    store.add_crop("c2", _crop("Jowar"))
+    expect_raises(CropExists, store.add_crops, "c1", [_crop("Jowar"), _crop("BAJRA")])
+    expect_raises(CropExists, store.add_crops, "c1", [_crop("Jowar"), _crop("jowar")])
+    expect([c["crop_name"] for c in store.get_crops("c1")] == ["Wheat", "Bajra"], "clashes write nothing")
+    store.add_crops("c1", [_crop("Jowar"), _crop("Tur")])
+    expect([c["crop_name"] for c in store.get_crops("c1")] == ["Wheat", "Bajra", "Jowar", "Tur"], "appended in order")
+    expect([c["crop_name"] for c in store.get_crops("c2")] == ["Jowar"], "other company untouched")
+
+
+@check
+def crop_updates(store):
+    store.add_crop("c1", _crop("Wheat", 20.0))
+    store.add_crop("c1", _crop("Bajra", 15.0))
+    expect_raises(CropNotFound, store.update_crop, "c1", "wheat", {"rate_per_unit": 1.0})
+    expect_raises(CropExists, store.update_crop, "c1", "Wheat", {"crop_name": "BAJRA"})
+
+    now = datetime.utcnow().replace(microsecond=0)
+    before, after = store.update_crop("c1", "Wheat", {"crop_name": "Wheat (Lokwan)", "rate_per_unit": 22.0,
+                                                      "updated_at": now, "updated_by": "clerk"})
+    expect(before["crop_name"] == "Wheat" and before["rate_per_unit"] == 20.0, "before image")
+    expect(after["crop_name"] == "Wheat (Lokwan)" and after["created_by"] == "admin", "after image keeps creation fields")
+    crops = store.get_crops("c1")
+    expect([c["crop_name"] for c in crops] == ["Wheat (Lokwan)", "Bajra"], "position kept on rename")
+    expect(crops[0]["updated_by"] == "clerk" and crops[0]["updated_at"] == now, "update stamped")
+
+    store.update_crop("c1", "Bajra", {"crop_name": "bajra"})
+    expect(store.get_crops("c1")[1]["crop_name"] == "bajra", "case-only rename is allowed")
+
+    expect_raises(CropNotFound, store.delete_crop, "c1", "Wheat")
+    store.delete_crop("c1", "bajra")
+    expect([c["crop_name"] for c in store.get_crops("c1")] == ["Wheat (Lokwan)"], "deleted")
+
+
+@check
+def bulk_rates(store):
+    expect_raises(CatalogNotFound, store.set_rates, "c9", {"Wheat": (None, 1.0)}, datetime.utcnow(), "clerk")
+    for name, rate in (("Wheat", 20.0), ("Bajra", 15.0), ("Jowar", 12.0)):
+        store.add_crop("c1", _crop(name, rate))
+    now = datetime.utcnow().replace(microsecond=0)
+
+    expect_raises(RateConflict, store.set_rates, "c1", {"Wheat": (20.0, 21.0), "Bajra": (99.0, 16.0)}, now, "clerk")
+    expect_raises(RateConflict, store.set_rates, "c1", {"Wheat": (None, 21.0), "Maize": (None, 9.0)}, now, "clerk")
+    expect([c["rate_per_unit"] for c in store.get_crops("c1")] == [20.0, 15.0, 12.0], "conflicts write nothing")
+
+    store.set_rates("c1", {"Wheat": (20.0, 20.8), "Jowar": (None, 13.5)}, now, "clerk")
+    crops = {c["crop_name"]: c for c in store.get_crops("c1")}
+    expect(crops["Wheat"]["rate_per_unit"] == 20.8 and crops["Jowar"]["rate_per_unit"] == 13.5, "rates set")
+    expect(crops["Wheat"]["updated_by"] == "clerk" and crops["Jowar"]["updated_at"] == now, "touched entries stamped")
+    expect(crops["Bajra"]["updated_by"] == "admin" and crops["Bajra"]["rate_per_unit"] == 15.0, "others untouched")
+    expect(crops["Wheat"]["created_by"] == "admin", "creation fields kept")
+    expect([c["crop_name"] for c in store.get_crops("c1")] == ["Wheat", "Bajra", "Jowar"], "order kept")
+
+
+@check
+def concurrent_usernames(store):
+    store.add_employee("c1", _emp("boss", "Admin"), create_company=True)
+    wins = []
+    barrier = threading.Barrier(8)
+
+    def attempt():
+        barrier.wait()
+        try:
+            store.add_employee("c1", _emp("dup"))
+            wins.append(1)
+        except UsernameTaken:
+            pass
+
+    threads = [threading.Thread(target=attempt) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    expect(len(wins) == 1, f"exactly one concurrent create wins, got {len(wins)}")
+
+
+def run(factory, label):
+    failed = 0
+    for fn in CHECKS:
+        store = factory()
+        try:
+            fn(store)
+            print(f"  ok    {label}.{fn.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {label}.{fn.__name__}: {type(e).__name__}: {e}")
+        finally:
+            store.close()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the storage conformance suite")
+    parser.add_argument("--mongo", metavar="URL", help="also run against a scratch database on this server")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="farmdesk-conformance-")
+    backends = [
+        ("memory", MemoryStore),
+        ("sqlite", lambda: SQLiteStore(os.path.join(tmp, uuid.uuid4().hex + ".db"))),
+        ("sqlite-memory", lambda: create_store("sqlite://")),
+        ("memory+shared-cache", lambda: CachedStore(MemoryStore(), SharedCache(os.path.join(tmp, uuid.uuid4().hex)))),
+    ]
+    if args.mongo:
+        from pymongo import MongoClient
+
+        def mongo():
+            client = MongoClient(args.mongo)
+            name = "farmdesk_conformance_" + uuid.uuid4().hex[:8]
+            store = create_store("mongo", client[name])
+            close = store.close
+
+            def drop_and_close():
+                client.drop_database(name)
+                close()
+            store.close = drop_and_close
+            return store
+        backends.append(("mongo", mongo))
+
+    failed = sum(run(factory, label) for label, factory in backends)
+    print(f"{len(CHECKS) * len(backends) - failed} passed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
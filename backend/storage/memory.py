@@ -0,0 +1,123 @@
+import copy
+import threading
+
+from .base import (
+    Store, CompanyNotFound, UsernameTaken, CatalogNotFound, CropNotFound, CropExists,
+    apply_crop_update, apply_rates, is_officer, officer_view, public_employee,
+)
+
+
+# ---------- In-memory backend ----------
+# For tests, benchmarks and throwaway single-process deployments. Per-company
+# state is immutable (tuples) and writers publish a new tuple under a lock, so
+# readers never take a lock: they read whatever tuple is current and copy out
+# only what they return.
+class MemoryStore(Store):
+    name = "memory"
+
+    def __init__(self):
+        self._employees = {}   # company_id -> tuple of employee dicts
+        self._crops = {}       # company_id -> tuple of crop dicts
+        self._write_lock = threading.Lock()
+
+    # ----- employees -----
+    def find_employee(self, company_id, username):
+        employees = self._employees.get(company_id)
+        if employees is None:
+            return False, None
+        for e in employees:
+            if e["username"] == username:
+                return True, dict(e)
+        return True, None
+
+    def get_employee(self, company_id, emp_id, username=None):
+        for e in self._employees.get(company_id, ()):
+            if str(e.get("_id")) == str(emp_id) or (username and e.get("username") == username):
+                return public_employee(e)
+        return None
+
+    def add_employee(self, company_id, emp, create_company=False):
+        with self._write_lock:
+            employees = self._employees.get(company_id)
+            if employees is None:
+                if not create_company:
+                    raise CompanyNotFound(company_id)
+                employees = ()
+            if any(e["username"] == emp["username"] for e in employees):
+                raise UsernameTaken(emp["username"])
+            self._employees[company_id] = employees + (dict(emp),)
+
+    def delete_officer(self, company_id, officer_id):
+        with self._write_lock:
+            employees = self._employees.get(company_id)
+            if employees is None:
+                raise CompanyNotFound(company_id)
+            remaining = tuple(e for e in employees if not (str(e["_id"]) == str(officer_id) and is_officer(e.get("role"))))
+            if len(remaining) == len(employees):
+                return False
+            self._employees[company_id] = remaining
+            return True
+
+    def list_officers(self, company_id, prefix="", after=None, limit=None):
+        officers = sorted(
+            (e for e in self._employees.get(company_id, ())
+             if is_officer(e.get("role")) and e["username"].startswith(prefix)
+             and (after is None or e["username"] > after)),
+            key=lambda e: e["username"],
+        )
+        if limit:
+            officers = officers[:limit]
+        return [officer_view(e) for e in officers]
+
+    # ----- crops -----
+    def get_crops(self, company_id, create=True):
+        crops = self._crops.get(company_id)
+        if crops is None:
+            if create:
+                with self._write_lock:
+                    self._crops.setdefault(company_id, ())
+            return []
+        return copy.deepcopy(list(crops))
+
+    def add_crop(self, company_id, crop):
+        with self._write_lock:
+            crops = self._crops.get(company_id, ())
+            if any(c["crop_name"].lower() == crop["crop_name"].lower() for c in crops):
+                raise CropExists(crop["crop_name"])
+            self._crops[company_id] = crops + (copy.deepcopy(crop),)
+
+    def add_crops(self, company_id, crops):
+        with self._write_lock:
+            existing = self._crops.get(company_id, ())
+            taken = {c["crop_name"].lower() for c in existing}
+            for crop in crops:
+                if crop["crop_name"].lower() in taken:
+                    raise CropExists(crop["crop_name"])
+                taken.add(crop["crop_name"].lower())
+            self._crops[company_id] = existing + tuple(copy.deepcopy(c) for c in crops)
+
+    def update_crop(self, company_id, crop_name, changes):
+        with self._write_lock:
+            crops = self._crops.get(company_id)
+            if crops is None:
+                raise CatalogNotFound(company_id)
+            updated, before, after = apply_crop_update(list(crops), crop_name, changes)
+            self._crops[company_id] = tuple(updated)
+            return before, after
+
+    def delete_crop(self, company_id, crop_name):
+        with self._write_lock:
+            crops = self._crops.get(company_id)
+            if crops is None:
+                raise CatalogNotFound(company_id)
+            remaining = tuple(c for c in crops if c["crop_name"] != crop_name)
+            if len(remaining) == len(crops):
+                raise CropNotFound(crop_name)
+            self._crops[company_id] = remaining
+
+    def set_rates(self, company_id, rates, updated_at, updated_by):
+        with self._write_lock:
+            crops = self._crops.get(company_id)
+            if crops is None:
+                raise CatalogNotFound(company_id)
+            self._crops[company_id] = tuple(apply_rates(crops, rates, updated_at, updated_by))
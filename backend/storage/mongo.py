@@ -0,0 +1,194 @@
+import re
+
+from .base import (
+    Store, CompanyNotFound, UsernameTaken, CatalogNotFound, CropNotFound, CropExists, RateConflict,
+    apply_crop_update, apply_rates, is_officer,
+)
+
+
+ADMIN_ROLE_RE = re.compile(r"^(company_admin|admin|superadmin)?$", re.IGNORECASE)
+
+
+def _direct(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+# ---------- MongoDB backend ----------
+# Same documents as always: one `companies` doc per company with embedded
+# employees, one `crops` doc per company with a crop_details array. `call`
+# wraps every driver call (the app passes its circuit breaker) and `flights`
+# coalesces concurrent identical reads.
+class MongoStore(Store):
+    name = "mongo"
+
+    def __init__(self, db, call=None, flights=None):
+        self.db = db
+        self.companies = db.companies
+        self.crops = db.crops
+        self.call = call or _direct
+        self.flights = flights
+
+    def _shared_find_one(self, collection, company_id, projection=None):
+        def load():
+            return self.call(collection.find_one, {"company_id": company_id}, projection)
+        if self.flights is None:
+            return load()
+        key = (collection.name, company_id, tuple(sorted(projection.items())) if projection else None)
+        return self.flights.do(key, load)
+
+    # ----- employees -----
+    def find_employee(self, company_id, username):
+        # $elemMatch projection: only the matching employee comes back, not the whole roster
+        comp = self.call(
+            self.companies.find_one,
+            {"company_id": company_id},
+            {"company_id": 1, "employees": {"$elemMatch": {"username": username}}},
+        )
+        if not comp:
+            return False, None
+        employees = comp.get("employees") or []
+        return True, (employees[0] if employees else None)
+
+    def get_employee(self, company_id, emp_id, username=None):
+        comp = self._shared_find_one(self.companies, company_id, {"employees.password_hash": 0})
+        if not comp:
+            return None
+        for e in comp.get("employees", []):
+            if str(e.get("_id")) == str(emp_id) or (username and e.get("username") == username):
+                return e
+        return None
+
+    def add_employee(self, company_id, emp, create_company=False):
+        # Uniqueness is enforced by the update filter, so concurrent creates cannot both win
+        res = self.call(
+            self.companies.update_one,
+            {"company_id": company_id, "employees.username": {"$ne": emp["username"]}},
+            {"$push": {"employees": emp}},
+        )
+        if res.matched_count:
+            return
+        exists = self.call(self.companies.find_one, {"company_id": company_id}, {"_id": 1})
+        if exists:
+            raise UsernameTaken(emp["username"])
+        if not create_company:
+            raise CompanyNotFound(company_id)
+        self.call(self.companies.insert_one, {"company_id": company_id, "employees": [emp]})
+
+    def delete_officer(self, company_id, officer_id):
+        comp = self.call(
+            self.companies.find_one,
+            {"company_id": company_id},
+            {"employees": {"$elemMatch": {"_id": officer_id}}},
+        )
+        if not comp:
+            raise CompanyNotFound(company_id)
+        employees = comp.get("employees") or []
+        if not employees or not is_officer(employees[0].get("role")):
+            return False
+        self.call(self.companies.update_one, {"company_id": company_id}, {"$pull": {"employees": {"_id": officer_id}}})
+        return True
+
+    def officer_pipeline(self, company_id, prefix="", after=None, limit=None):
+        # Same rule as is_officer(): missing, empty or admin-like roles are not officers
+        match = {"role": {"$type": "string", "$not": ADMIN_ROLE_RE}}
+        username = {}
+        if prefix:
+            username["$regex"] = "^" + re.escape(prefix)
+        if after is not None:
+            username["$gt"] = after
+        if username:
+            match["username"] = username
+
+        pipeline = [
+            {"$match": {"company_id": company_id}},
+            {"$project": {"_id": 0, "employees._id": 1, "employees.username": 1, "employees.role": 1}},
+            {"$unwind": "$employees"},
+            {"$replaceRoot": {"newRoot": "$employees"}},
+            {"$match": match},
+            {"$sort": {"username": 1}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+        return pipeline
+
+    def list_officers(self, company_id, prefix="", after=None, limit=None):
+        # A server-side cursor: callers can stream it without holding the roster in memory
+        return self.call(
+            self.companies.aggregate,
+            self.officer_pipeline(company_id, prefix, after, limit),
+            allowDiskUse=True,
+            batchSize=500,
+        )
+
+    # ----- crops -----
+    def get_crops(self, company_id, create=True):
+        crop_doc = self._shared_find_one(self.crops, company_id)
+        if not crop_doc:
+            if create:
+                self.call(self.crops.insert_one, {"company_id": company_id, "crop_details": []})
+            return []
+        return crop_doc.get("crop_details", [])
+
+    def add_crop(self, company_id, crop):
+        self.add_crops(company_id, [crop])
+
+    def add_crops(self, company_id, crops):
+        # The filter only matches while no existing name equals a new one case-insensitively,
+        # so a concurrent add or rename can never be pushed over
+        names = [c["crop_name"] for c in crops]
+        if len({n.lower() for n in names}) < len(names):
+            raise CropExists(next(n for i, n in enumerate(names) if n.lower() in {m.lower() for m in names[:i]}))
+        res = self.call(
+            self.crops.update_one,
+            {"company_id": company_id,
+             "crop_details.crop_name": {"$nin": [re.compile(f"^{re.escape(n)}$", re.IGNORECASE) for n in names]}},
+            {"$push": {"crop_details": {"$each": crops}}},
+        )
+        if res.matched_count:
+            return
+        crop_doc = self.call(self.crops.find_one, {"company_id": company_id}, {"crop_details.crop_name": 1})
+        if crop_doc is None:
+            self.call(self.crops.insert_one, {"company_id": company_id, "crop_details": [dict(c) for c in crops]})
+            return
+        taken = {c["crop_name"].lower() for c in crop_doc.get("crop_details", [])}
+        raise CropExists(next((n for n in names if n.lower() in taken), names[0]))
+
+    def update_crop(self, company_id, crop_name, changes):
+        crop_doc = self.call(self.crops.find_one, {"company_id": company_id})
+        if not crop_doc:
+            raise CatalogNotFound(company_id)
+        crop_details, before, after = apply_crop_update(crop_doc.get("crop_details", []), crop_name, changes)
+        self.call(self.crops.update_one, {"company_id": company_id}, {"$set": {"crop_details": crop_details}})
+        return before, after
+
+    def delete_crop(self, company_id, crop_name):
+        crop_doc = self.call(self.crops.find_one, {"company_id": company_id})
+        if not crop_doc:
+            raise CatalogNotFound(company_id)
+        crop_details = crop_doc.get("crop_details", [])
+        updated = [c for c in crop_details if c["crop_name"] != crop_name]
+        if len(updated) == len(crop_details):
+            raise CropNotFound(crop_name)
+        self.call(self.crops.update_one, {"company_id": company_id}, {"$set": {"crop_details": updated}})
+
+    def set_rates(self, company_id, rates, updated_at, updated_by):
+        # Recompute crop_details from one read and write it back with a single $set,
+        # guarded on the array being exactly what was read: the server does one
+        # linear comparison and one write, however many crops change
+        if not rates:
+            return
+        crop_doc = self.call(self.crops.find_one, {"company_id": company_id}, {"crop_details": 1})
+        if not crop_doc:
+            raise CatalogNotFound(company_id)
+        before = crop_doc.get("crop_details", [])
+        updated = apply_rates(before, rates, updated_at, updated_by)
+        res = self.call(
+            self.crops.update_one,
+            {"_id": crop_doc["_id"], "crop_details": before},
+            {"$set": {"crop_details": updated}},
+        )
+        if not res.matched_count:
+            raise RateConflict(company_id)
+
+    def close(self):
+        self.db.client.close()
@@ -0,0 +1,280 @@
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+
+from .base import (
+    Store, CompanyNotFound, UsernameTaken, CatalogNotFound, CropNotFound, CropExists, RateConflict,
+    is_officer, officer_view,
+)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    company_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS employees (
+    company_id TEXT NOT NULL REFERENCES companies(company_id),
+    _id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    password_hash BLOB,
+    role TEXT,
+    PRIMARY KEY (company_id, _id),
+    UNIQUE (company_id, username)
+);
+CREATE TABLE IF NOT EXISTS crop_catalogs (
+    company_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS crops (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_id TEXT NOT NULL REFERENCES crop_catalogs(company_id),
+    crop_name TEXT NOT NULL,
+    crop_key TEXT NOT NULL,
+    rate_per_unit REAL NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
+    created_by TEXT,
+    updated_by TEXT,
+    UNIQUE (company_id, crop_key)
+);
+"""
+
+CROP_COLUMNS = ("crop_name", "rate_per_unit", "created_at", "updated_at", "created_by", "updated_by")
+
+
+def _to_db(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _crop_from_row(row):
+    crop = dict(zip(CROP_COLUMNS, row))
+    for field in ("created_at", "updated_at"):
+        if crop[field]:
+            crop[field] = datetime.fromisoformat(crop[field])
+    return crop
+
+
+class _Connection:
+    # Held by one thread's threading.local: when the thread exits the holder is
+    # collected and its finalizer closes the connection
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+        weakref.finalize(self, conn.close)
+
+
+# ---------- SQLite backend ----------
+# For single-box deployments without a MongoDB server. Embedded employees and
+# crop_details become rows; uniqueness rules (exact usernames, case-insensitive
+# crop names) are enforced by UNIQUE constraints. Each thread gets its own
+# connection (closed again when the thread exits), and WAL mode lets readers
+# run alongside the single writer. A
+# ":memory:" database only exists inside one connection, so that case shares a
+# single connection behind a lock.
+class SQLiteStore(Store):
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()   # live _Connection holders, for close()
+        self._lock = threading.Lock()
+        self._shared = None
+        self._shared_lock = threading.RLock()
+        if path == ":memory:":
+            self._shared = self._connect()
+        with self._tx() as conn:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+    def _connect(self):
+        # Autocommit mode; writes open their own BEGIN IMMEDIATE transaction in _tx().
+        # Connections are only used by their own thread, but close() may run elsewhere.
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        holder = _Connection(conn)
+        with self._lock:
+            self._connections.add(holder)
+        return holder
+
+    @contextmanager
+    def _read(self):
+        if self._shared is not None:
+            with self._shared_lock:
+                yield self._shared.conn
+            return
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = self._local.holder = self._connect()
+        yield holder.conn
+
+    @contextmanager
+    def _tx(self):
+        # IMMEDIATE takes the write lock up front, so check-then-write is atomic
+        with self._read() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # ----- employees -----
+    def find_employee(self, company_id, username):
+        with self._read() as conn:
+            if not conn.execute("SELECT 1 FROM companies WHERE company_id = ?", (company_id,)).fetchone():
+                return False, None
+            row = conn.execute(
+                "SELECT _id, username, password_hash, role FROM employees WHERE company_id = ? AND username = ?",
+                (company_id, username),
+            ).fetchone()
+        if row is None:
+            return True, None
+        return True, {"_id": row[0], "username": row[1], "password_hash": bytes(row[2]) if row[2] is not None else None, "role": row[3]}
+
+    def get_employee(self, company_id, emp_id, username=None):
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT _id, username, role FROM employees WHERE company_id = ? AND (_id = ? OR username = ?) "
+                "ORDER BY _id = ? DESC LIMIT 1",
+                (company_id, str(emp_id), username, str(emp_id)),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"_id": row[0], "username": row[1], "role": row[2]}
+
+    def add_employee(self, company_id, emp, create_company=False):
+        with self._tx() as conn:
+            exists = conn.execute("SELECT 1 FROM companies WHERE company_id = ?", (company_id,)).fetchone()
+            if not exists:
+                if not create_company:
+                    raise CompanyNotFound(company_id)
+                conn.execute("INSERT OR IGNORE INTO companies (company_id) VALUES (?)", (company_id,))
+            try:
+                conn.execute(
+                    "INSERT INTO employees (company_id, _id, username, password_hash, role) VALUES (?, ?, ?, ?, ?)",
+                    (company_id, str(emp["_id"]), emp["username"], emp.get("password_hash"), emp.get("role")),
+                )
+            except sqlite3.IntegrityError:
+                raise UsernameTaken(emp["username"])
+
+    def delete_officer(self, company_id, officer_id):
+        with self._tx() as conn:
+            if not conn.execute("SELECT 1 FROM companies WHERE company_id = ?", (company_id,)).fetchone():
+                raise CompanyNotFound(company_id)
+            row = conn.execute(
+                "SELECT role FROM employees WHERE company_id = ? AND _id = ?", (company_id, str(officer_id))
+            ).fetchone()
+            if row is None or not is_officer(row[0]):
+                return False
+            conn.execute("DELETE FROM employees WHERE company_id = ? AND _id = ?", (company_id, str(officer_id)))
+            return True
+
+    def list_officers(self, company_id, prefix="", after=None, limit=None):
+        sql = "SELECT _id, username, role FROM employees WHERE company_id = ?"
+        params = [company_id]
+        if prefix:
+            sql += " AND substr(username, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        if after is not None:
+            sql += " AND username > ?"
+            params.append(after)
+        sql += " ORDER BY username"
+        # Role filtering happens in Python (normalize_role semantics), so LIMIT is applied there too
+        out = []
+        with self._read() as conn:
+            for row in conn.execute(sql, params):
+                if is_officer(row[2]):
+                    out.append(officer_view({"_id": row[0], "username": row[1], "role": row[2]}))
+                    if limit and len(out) == limit:
+                        break
+        return out
+
+    # ----- crops -----
+    def get_crops(self, company_id, create=True):
+        with self._read() as conn:
+            if create and not conn.execute("SELECT 1 FROM crop_catalogs WHERE company_id = ?", (company_id,)).fetchone():
+                conn.execute("INSERT OR IGNORE INTO crop_catalogs (company_id) VALUES (?)", (company_id,))
+            rows = conn.execute(
+                f"SELECT {', '.join(CROP_COLUMNS)} FROM crops WHERE company_id = ? ORDER BY position", (company_id,)
+            )
+            return [_crop_from_row(r) for r in rows]
+
+    def add_crop(self, company_id, crop):
+        with self._tx() as conn:
+            conn.execute("INSERT OR IGNORE INTO crop_catalogs (company_id) VALUES (?)", (company_id,))
+            try:
+                conn.execute(
+                    f"INSERT INTO crops (company_id, crop_key, {', '.join(CROP_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (company_id, crop["crop_name"].lower(), *(_to_db(crop.get(c)) for c in CROP_COLUMNS)),
+                )
+            except sqlite3.IntegrityError:
+                raise CropExists(crop["crop_name"])
+
+    def add_crops(self, company_id, crops):
+        with self._tx() as conn:
+            conn.execute("INSERT OR IGNORE INTO crop_catalogs (company_id) VALUES (?)", (company_id,))
+            for crop in crops:
+                try:
+                    conn.execute(
+                        f"INSERT INTO crops (company_id, crop_key, {', '.join(CROP_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (company_id, crop["crop_name"].lower(), *(_to_db(crop.get(c)) for c in CROP_COLUMNS)),
+                    )
+                except sqlite3.IntegrityError:
+                    raise CropExists(crop["crop_name"])
+
+    def update_crop(self, company_id, crop_name, changes):
+        with self._tx() as conn:
+            if not conn.execute("SELECT 1 FROM crop_catalogs WHERE company_id = ?", (company_id,)).fetchone():
+                raise CatalogNotFound(company_id)
+            row = conn.execute(
+                f"SELECT position, {', '.join(CROP_COLUMNS)} FROM crops WHERE company_id = ? AND crop_name = ?",
+                (company_id, crop_name),
+            ).fetchone()
+            if row is None:
+                raise CropNotFound(crop_name)
+            before = _crop_from_row(row[1:])
+            after = dict(before, **changes)
+            try:
+                conn.execute(
+                    f"UPDATE crops SET crop_key = ?, {', '.join(c + ' = ?' for c in CROP_COLUMNS)} WHERE position = ?",
+                    (after["crop_name"].lower(), *(_to_db(after.get(c)) for c in CROP_COLUMNS), row[0]),
+                )
+            except sqlite3.IntegrityError:
+                raise CropExists(after["crop_name"])
+            return before, after
+
+    def delete_crop(self, company_id, crop_name):
+        with self._tx() as conn:
+            if not conn.execute("SELECT 1 FROM crop_catalogs WHERE company_id = ?", (company_id,)).fetchone():
+                raise CatalogNotFound(company_id)
+            cur = conn.execute("DELETE FROM crops WHERE company_id = ? AND crop_name = ?", (company_id, crop_name))
+            if cur.rowcount == 0:
+                raise CropNotFound(crop_name)
+
+    def set_rates(self, company_id, rates, updated_at, updated_by):
+        with self._tx() as conn:
+            if not conn.execute("SELECT 1 FROM crop_catalogs WHERE company_id = ?", (company_id,)).fetchone():
+                raise CatalogNotFound(company_id)
+            current = dict(conn.execute(
+                "SELECT crop_name, rate_per_unit FROM crops WHERE company_id = ?", (company_id,)
+            ))
+            for crop_name, (expected, _) in rates.items():
+                if crop_name not in current or (expected is not None and current[crop_name] != expected):
+                    raise RateConflict(crop_name)
+            conn.executemany(
+                "UPDATE crops SET rate_per_unit = ?, updated_at = ?, updated_by = ? WHERE company_id = ? AND crop_name = ?",
+                [(rate, _to_db(updated_at), updated_by, company_id, crop_name) for crop_name, (_, rate) in rates.items()],
+            )
+
+    def close(self):
+        with self._lock:
+            for holder in list(self._connections):
+                holder.conn.close()
+            self._connections.clear()
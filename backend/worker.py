@@ -0,0 +1,264 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+from datetime import datetime
+from multiprocessing import Process
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from audit import AuditWriter
+from events import ChangeFeed
+from jobs import InvalidJob, JobQueue, LeaseLost, parse_import_payload, parse_reprice_payload
+from priceboard import PriceBoards
+from storage import CropExists, MongoStore, RateConflict
+
+
+# ---------- Job worker ----------
+# Run with `python worker.py --processes 4`. Each process claims jobs from the
+# shared queue, so more processes (or more hosts) simply means more throughput.
+IMPORT_CHUNK = 500
+CONFLICT_RETRIES = 5
+ERROR_BACKOFF_MAX = 60
+RESPAWN_INTERVAL = 1.0
+
+log = logging.getLogger("farmdesk.worker")
+
+
+class JobContext:
+    def __init__(self, queue, job, store, feed, audit, price_boards):
+        self.queue = queue
+        self.job = job
+        self.store = store
+        self.feed = feed
+        self.audit = audit
+        self.price_boards = price_boards
+
+    def catalog_changed(self, **data):
+        company_id = self.job["company_id"]
+        self.feed.publish(company_id, "crop", "bulk", job_id=self.job["_id"], **data)
+        self.feed.publish(company_id, "price_board", "publish", version=self.price_boards.rebuild(company_id))
+
+    def progress(self, done, total=None, message=None):
+        self.queue.progress(self.job, done, total, message)
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _guarded(write, chunk, what):
+    # Each chunk is planned against a fresh read and written with a guard, so admin
+    # edits made while the job runs are never overwritten; a lost race re-plans the chunk
+    for _ in range(CONFLICT_RETRIES):
+        try:
+            return write(chunk)
+        except (CropExists, RateConflict):
+            continue
+    raise RateConflict(f"{what} kept conflicting with concurrent crop edits")
+
+
+def import_crops(ctx):
+    # Payload: {"crops": [{"crop_name": ..., "rate_per_unit": ...}, ...]}
+    job = ctx.job
+    company_id = job["company_id"]
+    actor = job.get("created_by")
+
+    rows = parse_import_payload(job["payload"])
+    total = len(rows)
+    ctx.progress(0, total, "validated")
+
+    counts = {"added": 0, "updated": 0}
+
+    def write(chunk):
+        by_name = {c["crop_name"].lower(): c for c in ctx.store.get_crops(company_id)}
+        now = datetime.utcnow()
+        rates = {}
+        new = []
+        for key, (name, rate) in chunk:
+            existing = by_name.get(key)
+            if existing:
+                rates[existing["crop_name"]] = (existing["rate_per_unit"], rate)
+            else:
+                new.append({"crop_name": name, "rate_per_unit": rate, "created_at": now,
+                            "updated_at": now, "created_by": actor, "updated_by": actor})
+        # Rates first: if the add then loses a race, re-applying the same rates is harmless
+        ctx.store.set_rates(company_id, rates, now, actor)
+        if new:
+            ctx.store.add_crops(company_id, new)
+        counts["added"] += len(new)
+        counts["updated"] += len(rates)
+
+    done = 0
+    for chunk in _chunks(rows.items(), IMPORT_CHUNK):
+        _guarded(write, chunk, "Import")
+        done += len(chunk)
+        ctx.progress(done, total, "merging")
+
+    added, updated = counts["added"], counts["updated"]
+    ctx.progress(total, total, "done")
+    ctx.audit.emit("crop.import", company_id, actor=actor, target=job["_id"], added=added, updated=updated)
+    ctx.catalog_changed(added=added, updated=updated)
+    return {"added": added, "updated": updated}
+
+
+def reprice_crops(ctx):
+    # Payload: {"percent": 4.0, "prefix": "Tur"} -> +4% on every crop whose name starts with "Tur"
+    job = ctx.job
+    company_id = job["company_id"]
+    actor = job.get("created_by")
+    percent, prefix = parse_reprice_payload(job["payload"])
+
+    # Target rates are fixed once, on the first attempt, and stored on the job, so a
+    # retried job finishes the same plan instead of applying the percent again
+    plan = job.get("plan")
+    if plan is None:
+        plan = [
+            [c["crop_name"], c["rate_per_unit"], max(0.0, round(c["rate_per_unit"] * (1 + percent / 100), 2))]
+            for c in ctx.store.get_crops(company_id, create=False)
+            if c["crop_name"].lower().startswith(prefix)
+        ]
+        ctx.queue.save_plan(job, plan)
+    total = len(plan)
+    ctx.progress(0, total, "writing")
+
+    def write(chunk):
+        # Crops already at their target were written by an earlier attempt; crops renamed,
+        # deleted or re-priced by someone else since the plan was made are left alone
+        current = {c["crop_name"]: c["rate_per_unit"] for c in ctx.store.get_crops(company_id, create=False)}
+        rates = {name: (base, target) for name, base, target in chunk
+                 if current.get(name) == base and base != target}
+        ctx.store.set_rates(company_id, rates, datetime.utcnow(), actor)
+        return sum(1 for name, base, target in chunk if name in current and current[name] in (base, target))
+
+    touched = done = 0
+    for chunk in _chunks(plan, IMPORT_CHUNK):
+        touched += _guarded(write, chunk, "Re-price")
+        done += len(chunk)
+        ctx.progress(done, total, "writing")
+
+    if touched:
+        ctx.audit.emit("crop.reprice", company_id, actor=actor, target=job["_id"], percent=percent, count=touched)
+        ctx.catalog_changed(updated=touched)
+    return {"updated": touched, "skipped": total - touched}
+
+
+HANDLERS = {
+    "import_crops": import_crops,
+    "reprice_crops": reprice_crops,
+}
+
+
+def run(worker_id, poll_interval, types=None):
+    load_dotenv()
+    db = MongoClient(os.getenv("DATABASE_URL"))["FarmDesk"]
+    queue = JobQueue(
+        db.jobs,
+        lease_seconds=int(os.getenv("JOB_LEASE_SECONDS", 60)),
+        tenant_concurrency=int(os.getenv("JOB_TENANT_CONCURRENCY", 2)),
+    )
+    feed = ChangeFeed(db)
+    audit = AuditWriter(db.audit_events)
+    price_boards = PriceBoards(db)
+    store = MongoStore(db)
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+
+    last_reap = 0
+    errors = 0
+    while not stopping:
+        try:
+            if time.monotonic() - last_reap > 30:
+                queue.reap()
+                last_reap = time.monotonic()
+            job = queue.claim(worker_id, types or list(HANDLERS))
+        except Exception:
+            # The queue itself is unreachable: back off and keep the process alive
+            errors += 1
+            delay = min(ERROR_BACKOFF_MAX, poll_interval * 2 ** min(errors, 10))
+            log.exception("Job queue unavailable, retrying in %.1fs", delay)
+            time.sleep(delay)
+            continue
+        errors = 0
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        handler = HANDLERS.get(job["type"])
+        try:
+            if handler is None:
+                raise InvalidJob(f"No handler for job type {job['type']}")
+            result = handler(JobContext(queue, job, store, feed, audit, price_boards))
+        except LeaseLost:
+            continue  # another worker owns the job now
+        except InvalidJob as e:
+            _settle(queue.fail, job, e, retry=False)
+            continue
+        except Exception as e:
+            log.exception("Job %s (%s) failed", job["_id"], job["type"])
+            _settle(queue.fail, job, e)
+            continue
+        _settle(queue.complete, job, result)
+    audit.close()
+
+
+def _settle(fn, job, *args, **kwargs):
+    # If recording the outcome fails, the lease expires and the job is retried; handlers
+    # are safe to re-run (imports set absolute rates, re-prices resume their stored plan)
+    try:
+        fn(job, *args, **kwargs)
+    except Exception:
+        log.exception("Could not record the outcome of job %s", job["_id"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process FarmDesk background jobs")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--type", action="append", dest="types", choices=sorted(HANDLERS),
+                        help="only process these job types (repeatable)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    load_dotenv()
+    JobQueue(MongoClient(os.getenv("DATABASE_URL"))["FarmDesk"].jobs).ensure_indexes()
+
+    host = socket.gethostname()
+    if args.processes == 1:
+        run(f"{host}:{os.getpid()}", args.poll_interval, args.types)
+        return
+
+    def spawn(n):
+        p = Process(target=run, args=(f"{host}:{os.getpid()}:{n}", args.poll_interval, args.types))
+        p.start()
+        return p
+
+    procs = [spawn(n) for n in range(args.processes)]
+    stopping = []
+
+    def stop(*_):
+        stopping.append(True)
+        for p in procs:
+            p.terminate()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while not stopping:
+        # A child that died anyway (OOM kill, a bug) is replaced rather than left for dead
+        for n, p in enumerate(procs):
+            if not p.is_alive() and not stopping:
+                log.error("Worker process %s exited with %s, restarting", n, p.exitcode)
+                procs[n] = spawn(n)
+        time.sleep(RESPAWN_INTERVAL)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()